@@ -1,9 +1,33 @@
 from array import array
 from numbers import Integral, Real
-from functools import reduce
-from collections import Iterable
-from operator import add
+from collections.abc import Iterable
+from itertools import chain, repeat
+from operator import add, mul
 
+try:
+    from math import sumprod as dot
+except ImportError:  # Python < 3.12
+    def dot(a, b):
+        """Sum of products of elements of a and b."""
+        return sum(map(mul, a, b))
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional, see NumpyBackend
+    numpy = None
+
+
+# typecode of elements of matrix
+TYPECODE = 'f'
+
+# typecode of elements of integer matrices (results of pow with modulo)
+INTEGER_TYPECODE = 'q'
+
+# count of columns of right matrix, multiplied by all rows of left one at once
+MATMUL_BLOCK_COLUMNS = 64
+
+# count of elements of matrix, from which operations are run by NumPy
+NUMPY_MIN_SIZE = 256
 
 
 def normalize(elements):
@@ -31,29 +55,194 @@ def flatten(elements):
     return flattened
 
 
-class Matrix:
+def _shifted_slice(indices, base):
+    """Slice of buffer for range of indices, shifted by base offset."""
+    start = base + indices.start
+    stop = base + indices.stop
+    # stop before the beginning of buffer means no stop for negative step
+    return slice(start, stop if stop >= 0 else None, indices.step)
+
+
+def matmul(left, right, rows, inner, columns, out=None):
+    """Product of flat arrays of matrices in row-major order.
+
+    Columns of right matrix are taken by blocks of MATMUL_BLOCK_COLUMNS
+    strided slices: block is small enough to stay in cache, while every
+    row of left matrix is multiplied by all its columns. Each element
+    is one dot call, so products are summed in C without temporary lists.
+    Rows and columns are converted to lists of floats first, as items of
+    lists are taken faster than ones of arrays.
+
+    Args:
+        left(array): rows x inner elements.
+        right(array): inner x columns elements.
+        out(array): array of rows x columns elements to write product into,
+            it must not be left or right one. New array by default.
+
+    Returns:
+        array: rows x columns elements of product.
     """
+    product = array(TYPECODE, [0]) * (rows * columns) if out is None else out
+    for start in range(0, columns, MATMUL_BLOCK_COLUMNS):
+        stop = min(start + MATMUL_BLOCK_COLUMNS, columns)
+        block = [right[c::columns].tolist() for c in range(start, stop)]
+        for r in range(rows):
+            row = left[r * inner:(r + 1) * inner].tolist()
+            product[r * columns + start:r * columns + stop] = \
+                array(product.typecode, map(dot, repeat(row), block))
+    return product
+
+
+def matmul_modulo(left, right, size, modulo, out):
+    """Product of square matrices of ints modulo modulo, written into out.
+
+    Args:
+        left(list): size x size ints in row-major order.
+        right(list): size x size ints in row-major order.
+        out(list): list of size x size items, it must not be left or right one.
+    """
+    columns = [right[c::size] for c in range(size)]
+    for r in range(size):
+        row = left[r * size:(r + 1) * size]
+        out[r * size:(r + 1) * size] = [dot(row, column) % modulo for column in columns]
+    return out
+
+
+class PythonBackend:
+    """Operations on flat arrays of elements (row-major order) in pure Python."""
+    name = 'python'
+
+    @staticmethod
+    def elementwise(operation, data, other):
+        """Array of operation of elements and number or elements of other array."""
+        others = repeat(other) if isinstance(other, Real) else other
+        return array(TYPECODE, map(operation, data, others))
+
+    matmul = staticmethod(matmul)
+
+    @staticmethod
+    def transpose(data, rows, columns):
+        # columns of matrix are strided slices of its elements
+        transposed = array(data.typecode)
+        for c in range(columns):
+            transposed.extend(data[c::columns])
+        return transposed
+
+
+class NumpyBackend(PythonBackend):
+    """Operations by vectorized NumPy functions.
+
+    Arrays are seen by NumPy without copying (buffer protocol), only
+    the result is written into a new array. Like in pure Python, elements
+    are computed as float64 and rounded to float32, so results are
+    the same (matmul sums in other order, so they can differ in rare
+    cases of rounding). Matrices with less than NUMPY_MIN_SIZE elements
+    are handled by PythonBackend, as calls of NumPy cost more for them.
+    """
+    name = 'numpy'
+
+    @staticmethod
+    def _view(data, rows, columns):
+        """Float64 ndarray of elements of array."""
+        return numpy.frombuffer(data, dtype=data.typecode).reshape(rows, columns).astype(numpy.float64)
 
+    @staticmethod
+    def _result(values, out=None):
+        """Array of float32 elements of ndarray, written without temporary objects."""
+        data = array(TYPECODE, [0]) * values.size if out is None else out
+        numpy.frombuffer(data, dtype=data.typecode)[:] = values.ravel()
+        return data
+
+    @classmethod
+    def elementwise(cls, operation, data, other):
+        ufunc = {add: numpy.add, mul: numpy.multiply}.get(operation)
+        if ufunc is None or len(data) < NUMPY_MIN_SIZE:
+            return PythonBackend.elementwise(operation, data, other)
+        if isinstance(other, Real):
+            other = float(other)
+        else:
+            other = cls._view(other, 1, len(other))
+        return cls._result(ufunc(cls._view(data, 1, len(data)), other))
+
+    @classmethod
+    def matmul(cls, left, right, rows, inner, columns, out=None):
+        if max(len(left), len(right)) < NUMPY_MIN_SIZE:
+            return PythonBackend.matmul(left, right, rows, inner, columns, out)
+        product = numpy.matmul(cls._view(left, rows, inner), cls._view(right, inner, columns))
+        return cls._result(product, out)
+
+    @classmethod
+    def transpose(cls, data, rows, columns):
+        if len(data) < NUMPY_MIN_SIZE:
+            return PythonBackend.transpose(data, rows, columns)
+        transposed = array(data.typecode, [0]) * len(data)
+        numpy.frombuffer(transposed, dtype=data.typecode).reshape(columns, rows)[:] = \
+            numpy.frombuffer(data, dtype=data.typecode).reshape(rows, columns).T
+        return transposed
+
+
+# backend of operations of matrices, NumPy one if it is installed
+BACKEND = NumpyBackend if numpy is not None else PythonBackend
+
+
+class Matrix:
+    """Matrix of float numbers.
+
+    Elements are float32, except results of pow with modulo: they are
+    exact integers (int64), arithmetic on them gives float matrices again,
+    as well as setting not integer elements.
+
+    Elements are kept in one contiguous array (row-major order) with
+    metadata: size, offset of the first element and strides of rows
+    and columns, so the element (r, c) is data[offset + r * strides[0] + c * strides[1]].
+    There are no per-row objects, and elements can be exported without
+    copying through buffer protocol (memoryview(matrix) on Python 3.12+,
+    matrix.buffer() on older ones).
+
+    Slices (m[1:3], m[:, ::2]) are views: they share the array with
+    the matrix, so setting elements of one is seen by another, and
+    a small view keeps the whole array alive. Use copy() for matrix
+    with its own elements. In-place operators (+=, @=, ...) give
+    the matrix new array, they don't change its views.
     """
     def __init__(self, elements):
         # Matrix can be created only for iterable of numbers
         # and iterable of iterable of numbers
         # E.g. list of floats or list of array of ints
-        iterator = iter(elements)
+        elements = list(elements)
         # check if elements are numbers
         if all(isinstance(rest, Real)
-                for rest in iterator):
-            self._elements = [array('f', elements)]
+                for rest in elements):
+            rows = [elements]
             # che if all elements are iterable
         elif all(isinstance(rest, Iterable)
-                 for rest in iterator):
-            self._elements = [array('f', row)
-                              for row in normalize(elements)]
+                 for rest in elements):
+            # rows are copied, so normalization doesn't change given data
+            rows = normalize([list(row) for row in elements])
         else:
             raise TypeError('All elements of data must be numbers or iterables')
 
-        self._rows = len(self._elements)
-        self._columns = len(self._elements[0])
+        self._set_storage(array(TYPECODE, chain.from_iterable(rows)),
+                          len(rows), len(rows[0]))
+
+    def _set_storage(self, data, rows, columns, offset=0, strides=None):
+        self._data = data
+        self._rows = rows
+        self._columns = columns
+        self._offset = offset
+        self._strides = strides or (columns, 1)
+
+    @classmethod
+    def _from_flat(cls, data, rows, columns):
+        """Matrix of rows x columns elements of array in row-major order, without copying."""
+        matrix = cls.__new__(cls)
+        matrix._set_storage(data, rows, columns)
+        return matrix
+
+    def _assign(self, other):
+        """Take storage of other matrix (for in-place operations)."""
+        self._set_storage(other._data, other._rows, other._columns,
+                          other._offset, other._strides)
 
     @property
     def rows(self):
@@ -70,6 +259,41 @@ class Matrix:
     def __len__(self):
         return self.rows * self.columns
 
+    # ----------------------------------------------------------
+    # Work with storage of matrix
+    # ----------------------------------------------------------
+
+    def _is_contiguous(self):
+        """Check if elements are the whole array in row-major order."""
+        return self._offset == 0 and self._strides == (self.columns, 1) \
+            and len(self._data) == len(self)
+
+    def _row_slice(self, r):
+        """Slice of array with elements of row r (0 <= r < rows)."""
+        return _shifted_slice(range(0, self.columns * self._strides[1], self._strides[1]),
+                              self._offset + r * self._strides[0])
+
+    def _flat(self):
+        """Elements in row-major order, the array itself if it is contiguous."""
+        if self._is_contiguous():
+            return self._data
+        # rows follow each other, e.g. in view of several whole rows
+        if self._strides == (self.columns, 1):
+            return self._data[self._offset:self._offset + len(self)]
+        flat = array(self._data.typecode)
+        for r in range(self.rows):
+            flat.extend(self._data[self._row_slice(r)])
+        return flat
+
+    def buffer(self):
+        """Elements as 2-d memoryview (rows x columns), without copying of contiguous matrix."""
+        view = memoryview(self._flat())
+        # memoryview can't have zeros in shape, so empty matrix is 1-d
+        return view.cast('B').cast(self._data.typecode, self.size) if len(self) else view
+
+    def __buffer__(self, flags):
+        return self.buffer()
+
     # ----------------------------------------------------------
     # Work with elements of matrix
     # ----------------------------------------------------------
@@ -97,37 +321,56 @@ class Matrix:
         else:
             raise TypeError("Matrix indices must be int, slice or tuple of them")
 
-    def __getitem__(self, index):
-        # Get indices of rows in columns.
-        r, c = self._split_indices(index)
-
-        temp_data = list(self)
+    @staticmethod
+    def _select(index, length):
+        """Range of selected indices of rows or columns.
 
-        # selecting rows of matrix
-        if r is not None:
-            if isinstance(r, Integral):
-                temp_data = [temp_data[r]]
-            elif isinstance(r, slice):
-                temp_data = temp_data[r]
-
-        # selecting columns of matrix
-        if c is not None:
-            if isinstance(c, Integral):
-                temp_data = [[row[c]] for row in temp_data]
-            elif isinstance(c, slice):
-                temp_data = [row[c] for row in temp_data]
+        Int index is a range of one index, None selects all.
+        """
+        if index is None:
+            return range(length)
+        elif isinstance(index, Integral):
+            index = range(length)[index]
+            return range(index, index + 1)
+        elif isinstance(index, slice):
+            return range(length)[index]
+        raise TypeError("Matrix indices must be int, slice or tuple of them")
 
-        # create matrix from selected data
-        res_matrix = Matrix(temp_data)
+    def __getitem__(self, index):
+        # single element is fetched without ranges of indices
+        if type(index) is tuple and len(index) == 2 \
+                and isinstance(index[0], Integral) and isinstance(index[1], Integral):
+            r = range(self.rows)[index[0]]
+            c = range(self.columns)[index[1]]
+            return self._data[self._offset + r * self._strides[0] + c * self._strides[1]]
 
-        # if res_matrix is 1 x 1, return numeric value
-        if res_matrix.size == (1, 1):
-            return res_matrix._elements[0][0]
+        # Get indices of rows in columns.
+        r, c = self._split_indices(index)
+        rows = self._select(r, self.rows)
+        columns = self._select(c, self.columns)
 
-        if res_matrix.rows == 0 or res_matrix.columns == 0:
+        # if matrix is empty, return None
+        if not rows or not columns:
             return None
 
-        return res_matrix
+        # if matrix is 1 x 1, return numeric value
+        if len(rows) == 1 and len(columns) == 1:
+            return self._data[self._offset + rows[0] * self._strides[0]
+                              + columns[0] * self._strides[1]]
+
+        # view of selected rows and columns shares elements with matrix
+        view = type(self).__new__(type(self))
+        view._set_storage(
+            self._data, len(rows), len(columns),
+            self._offset + rows.start * self._strides[0] + columns.start * self._strides[1],
+            (rows.step * self._strides[0], columns.step * self._strides[1]),
+        )
+        return view
+
+    def copy(self):
+        """Matrix of the same elements with its own storage (e.g. copy of view)."""
+        return type(self)._from_flat(array(self._data.typecode, self._flat()),
+                                     self.rows, self.columns)
 
     def __setitem__(self, key, value):
         # Get indices of rows in columns.
@@ -136,14 +379,17 @@ class Matrix:
         # set single element of matrix
         if isinstance(value, Real) and isinstance(r, Integral) \
                 and isinstance(c, Integral):
-            self._elements[r][c] = value
+            r = range(self.rows)[r]
+            c = range(self.columns)[c]
+            value = self._storage_array([value])[0]
+            self._data[self._offset + r * self._strides[0] + c * self._strides[1]] = value
         # set single row of matrix
         elif isinstance(value, Iterable) and isinstance(r, Integral) \
                 and c is None:
-            row = array('f', value)
+            row = self._storage_array(value)
             # check compatibility of rows length
             if len(row) == self.columns:
-                self._elements[r] = row
+                self._data[self._row_slice(range(self.rows)[r])] = row
             else:
                 raise IndexError('Wrong length of inserted row. '
                                  'Must be less or equal to matrix row length')
@@ -153,24 +399,35 @@ class Matrix:
         else:
             raise TypeError('Only single value or single row can be inserted')
 
+    def _storage_array(self, values):
+        """Array of values, that can be written into storage of matrix.
+
+        Integer matrix (result of pow with modulo) becomes float one for
+        not integer values: like in-place operators, it gets new array.
+        """
+        values = list(values)
+        if self._data.typecode == INTEGER_TYPECODE and all(isinstance(v, Real) for v in values):
+            if all(isinstance(v, Integral) or float(v).is_integer() for v in values):
+                return array(INTEGER_TYPECODE, map(int, values))
+            self._set_storage(array(TYPECODE, self._flat()), self.rows, self.columns)
+        return array(self._data.typecode, values)
+
     def __iter__(self):
-        return iter(self._elements)
+        # rows of matrix as arrays
+        return (self._data[self._row_slice(r)] for r in range(self.rows))
 
     def __repr__(self):
         # set format for each element
         element = '{:.3f}'
-        tmp = element.format(3.23)
         # get substrings for each element
-        elements = list()
-        for el in self._elements:
-            elements.append(element.format(e) for e in el)
+        elements = [element.format(e) for e in self._flat()]
         # find the longest substring
-        maxstring = len(max(flatten(elements), key=len))
+        maxstring = len(max(elements, key=len, default=''))
         # add spaces to each substring that shorter than the longest one
         # and compose them to matrix rows
-        elements = [' | '.join(e.rjust(maxstring)
-                               for e in el) for el in elements]
-        return '\n'.join(elements)
+        elements = [e.rjust(maxstring) for e in elements]
+        return '\n'.join(' | '.join(elements[i:i + self.columns])
+                         for i in range(0, len(self), self.columns or 1))
 
     def __str__(self):
         s = f'Matrix {self.rows} x {self.columns}\n'
@@ -179,36 +436,34 @@ class Matrix:
 
     def __eq__(self, other):
         if isinstance(other, Matrix):
-            return len(self) == len(other) and self._elements == other._elements
+            return self.size == other.size and self._flat() == other._flat()
         return False
 
     # ---------------------------------------------------------
     # Addition operation
     # ---------------------------------------------------------
 
-    def __add__(self, other):
-        # Matrix + Numeric
-        if isinstance(other, Real):
-            result = [[i + other for i in el] for el in self._elements]
-            return Matrix(result)
-        # Matrix + Matrix
-        elif isinstance(other, type(self)):
+    def _elementwise(self, operation, other):
+        """Matrix of operation of elements and number or elements of matrix of same size."""
+        if isinstance(other, Matrix):
             # matrices must be of same size
-            if self.columns == other.columns and self.rows == other.rows:
-                pairs = list(zip(flatten(self._elements), flatten(other._elements)))
-                result = [[a + b for a, b in pairs[i:i+self.rows]]
-                          for i in range(0, len(self), self.rows)]
-                return Matrix(result)
-            else:
+            if self.size != other.size:
                 raise IndexError
-        else:
+            other = other._flat()
+        elif not isinstance(other, Real):
             raise TypeError
+        data = BACKEND.elementwise(operation, self._flat(), other)
+        return type(self)._from_flat(data, self.rows, self.columns)
+
+    def __add__(self, other):
+        # Matrix + Numeric or Matrix + Matrix
+        return self._elementwise(add, other)
 
     def __radd__(self, other):
         return self + other
 
     def __iadd__(self, other):
-        self._elements = (self + other)._elements
+        self._assign(self + other)
         return self
 
     # ------------------------------------------------------
@@ -219,7 +474,7 @@ class Matrix:
         return self + (-1) * other
 
     def __isub__(self, other):
-        self._elements = (self - other)._elements
+        self._assign(self - other)
         return self
 
     # ------------------------------------------------------
@@ -229,8 +484,7 @@ class Matrix:
     def __mul__(self, other):
         # Matrix * Numeric
         if isinstance(other, Real):
-            result = [[i * other for i in el] for el in self._elements]
-            return Matrix(result)
+            return self._elementwise(mul, other)
         else:
             raise TypeError
 
@@ -238,7 +492,7 @@ class Matrix:
         return self * other
 
     def __imul__(self, other):
-        self._elements = (self * other)._elements
+        self._assign(self * other)
         return self
 
     # ------------------------------------------------------
@@ -251,26 +505,13 @@ class Matrix:
             raise TypeError
 
         if self.columns == other.rows:
-            other_temp = other.transpose()
-            return Matrix(
-                [
-                    # get sum of production of row elements
-                    [reduce(
-                        add,
-                        # get productions of row elements with each other
-                        [a * b for a, b in zip(
-                            self._elements[r1],
-                            other_temp._elements[r2])]
-                    )
-                        for r2 in range(other_temp.rows)
-                    ]
-                    for r1 in range(self.rows)
-                ])
+            data = BACKEND.matmul(self._flat(), other._flat(), self.rows, self.columns, other.columns)
+            return type(self)._from_flat(data, self.rows, other.columns)
         else:
             raise IndexError
 
     def __imatmul__(self, other):
-        self._elements = (self @ other)._elements
+        self._assign(self @ other)
         return self
 
     # ------------------------------------------------------
@@ -278,52 +519,93 @@ class Matrix:
     # ------------------------------------------------------
 
     def __pow__(self, power, modulo=None):
-        # Matrix ** Numeric
+        # Matrix ** Numeric or pow(Matrix, Numeric, modulo)
         # works only for square matrices
         if self.rows != self.columns:
             raise ValueError('Can not find power of non-square matrix')
 
-        if isinstance(power, Integral):
-            # Returns even matrix if power is 0
-            if power == 0:
-                return Matrix.even(self.rows)
-            elif power == 1:
-                return self
-            elif power > 1:
-                base_val = self
-                for i in range(power - 1):
-                    base_val @= self
-                return base_val
-            else:
-                raise ValueError("Matrix power can't be negative")
-        else:
+        if not isinstance(power, Integral):
             raise ValueError('Matrix power must be >= 0')
+        if power < 0:
+            raise ValueError("Matrix power can't be negative")
+        if modulo is not None:
+            return self._power_modulo(power, modulo)
+
+        # Returns even matrix if power is 0
+        if power == 0:
+            return type(self).even(self.rows)
+        elif power == 1:
+            return self
+
+        # exponentiation by squaring: base is squared for every bit of power
+        # and result is multiplied by base for set bits, products are
+        # written into free one of three buffers
+        size = self.rows
+        base = array(TYPECODE, self._flat())
+        scratch = array(TYPECODE, [0]) * len(base)
+        result = None
+        while True:
+            if power & 1:
+                if result is None:
+                    result = array(TYPECODE, base)
+                else:
+                    BACKEND.matmul(result, base, size, size, size, out=scratch)
+                    result, scratch = scratch, result
+            power >>= 1
+            if not power:
+                return type(self)._from_flat(result, size, size)
+            BACKEND.matmul(base, base, size, size, size, out=scratch)
+            base, scratch = scratch, base
+
+    def _power_modulo(self, power, modulo):
+        """Power of integer matrix modulo modulo, computed by exact ints."""
+        if not isinstance(modulo, Integral):
+            raise TypeError('Modulo of matrix power must be integer')
+        if modulo == 0:
+            raise ValueError('Modulo of matrix power can not be 0')
+        # elements of result are kept as int64
+        if abs(modulo) > 2 ** 63:
+            raise ValueError('Modulo of matrix power must be in range [-2**63, 2**63]')
+        elements = self._flat()
+        if not all(float(e).is_integer() for e in elements):
+            raise TypeError('Matrix power with modulo needs integer elements')
+
+        size = self.rows
+        base = [int(e) % modulo for e in elements]
+        result = [(1 if i % (size + 1) == 0 else 0) % modulo for i in range(len(base))]
+        scratch = [0] * len(base)
+        while power:
+            if power & 1:
+                matmul_modulo(result, base, size, modulo, scratch)
+                result, scratch = scratch, result
+            power >>= 1
+            if power:
+                matmul_modulo(base, base, size, modulo, scratch)
+                base, scratch = scratch, base
+        return type(self)._from_flat(array(INTEGER_TYPECODE, result), size, size)
 
     def __ipow__(self, other):
-        self._elements = (self ** other)._elements
+        self._assign(self ** other)
         return self
 
     def is_square_matrix(self):
         return self.rows == self.columns
 
     def transpose(self):
-        cls = type(self)
-        transposed = [flatten(self._elements)[i::self.columns]
-                      for i in range(self.columns)]
-
-        return cls(transposed)
+        transposed = BACKEND.transpose(self._flat(), self.rows, self.columns)
+        return type(self)._from_flat(transposed, self.columns, self.rows)
 
     @classmethod
     def zero(cls, rows, columns):
-        s = [[0 for _ in range(columns)] for _ in range(rows)]
-        return cls(s)
+        return cls._from_flat(array(TYPECODE, [0]) * (rows * columns), rows, columns)
 
     @classmethod
     def even(cls, rows):
-        s = [[1 if i == j else 0 for i in range(rows)] for j in range(rows)]
-        return cls(s)
+        s = cls.zero(rows, rows)
+        # elements of diagonal are every (rows + 1)-th ones
+        s._data[::rows + 1] = array(TYPECODE, [1]) * rows
+        return s
 
 
 if __name__ == '__main__':
     print(Matrix([[1111111111111, 2, 5747.346], [2, 453]]))
-
@@ -0,0 +1,73 @@
+"""Benchmark of multiplication of matrices of matrixlib.
+
+Matrix.__matmul__ is compared with the former implementation:
+transpose of right matrix and reduce of list of products for every
+element. It is run only for small sizes, as it takes minutes for 1024.
+
+Usage:
+    python3 -m task_3.matrixlib_benchmark --sizes 64,128,256,512,1024
+    python3 -m task_3.matrixlib_benchmark --backend python
+"""
+import random
+import time
+from functools import reduce
+from operator import add
+
+import click
+
+from . import matrixlib
+from .matrixlib import Matrix
+
+
+def reference_matmul(left, right):
+    """Product of matrices by the former implementation of Matrix.__matmul__."""
+    left_rows = [list(row) for row in left]
+    right_columns = [list(column) for column in right.transpose()]
+    return Matrix([
+        [reduce(add, [a * b for a, b in zip(row, column)]) for column in right_columns]
+        for row in left_rows
+    ])
+
+
+def random_matrix(rows, columns, seed=0):
+    rand = random.Random(seed)
+    return Matrix([[rand.uniform(-1, 1) for _ in range(columns)] for _ in range(rows)])
+
+
+def best_time(function, repeat):
+    """The least time (seconds) of repeated calls of function."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+@click.command()
+@click.option('--sizes', default='64,128,256,512,1024', help='Sizes of square matrices.')
+@click.option('--reference-max', default=256, type=click.IntRange(min=0),
+              help='The largest size, multiplied also by the former implementation.')
+@click.option('--repeat', default=3, type=click.IntRange(min=1), help='Runs of every size.')
+@click.option('--backend', type=click.Choice(['python', 'numpy']), default=None,
+              help='Backend of matrixlib, NumPy one if it is installed by default.')
+def benchmark(sizes, reference_max, repeat, backend):
+    """Print time of multiplication of square matrices of given sizes."""
+    if backend == 'numpy' and matrixlib.numpy is None:
+        raise click.BadParameter('NumPy is not installed', param_hint='--backend')
+    if backend is not None:
+        matrixlib.BACKEND = {'python': matrixlib.PythonBackend, 'numpy': matrixlib.NumpyBackend}[backend]
+    click.echo(f'backend: {matrixlib.BACKEND.name}')
+    click.echo(f'{"size":>6} {"matmul":>10} {"former":>10} {"speedup":>8}')
+    for size in map(int, sizes.split(',')):
+        left, right = random_matrix(size, size, 1), random_matrix(size, size, 2)
+        seconds = best_time(lambda: left @ right, repeat)
+        if size <= reference_max:
+            former = best_time(lambda: reference_matmul(left, right), repeat)
+            click.echo(f'{size:>6} {seconds:>9.4f}s {former:>9.4f}s {former / seconds:>7.1f}x')
+        else:
+            click.echo(f'{size:>6} {seconds:>9.4f}s {"-":>10} {"-":>8}')
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -1,4 +1,6 @@
-from unittest import TestCase
+import random
+from unittest import TestCase, skipUnless
+from . import matrixlib
 from .matrixlib import Matrix, flatten
 from array import array
 
@@ -174,3 +176,150 @@ class MatrixTester(TestCase):
         self.assertEqual(id0, id_check)
 
 
+
+    def test_flat_storage(self):
+        data = [[1, 2, 3], [4, 5]]
+        m = Matrix(data)
+        # given data is not changed by normalization
+        self.assertEqual(data, [[1, 2, 3], [4, 5]])
+        self.assertEqual(m._data, array('f', [1, 2, 3, 4, 5, 0]))
+        self.assertEqual(list(m), [array('f', [1, 2, 3]), array('f', [4, 5, 0])])
+        self.assertEqual(m[-1, -2], 5)
+        self.assertEqual(m[:, ::-2], Matrix([[3, 1], [0, 4]]))
+        self.assertEqual(m + Matrix([[1, 1, 1], [2, 2, 2]]), Matrix([[2, 3, 4], [6, 7, 2]]))
+        self.assertNotEqual(m, Matrix([[1, 2], [3, 4], [5, 0]]))
+        m @= Matrix([[1], [1], [1]])
+        self.assertEqual(m.size, (2, 1))
+
+    def test_buffer_export(self):
+        m = Matrix([[1, 2, 3], [4, 5, 6]])
+        view = m.buffer()
+        self.assertEqual(view.shape, (2, 3))
+        self.assertEqual(view.tolist(), [[1, 2, 3], [4, 5, 6]])
+        # elements are not copied
+        view[1, 2] = 7
+        self.assertEqual(m[1, 2], 7)
+
+    def test_blocked_matmul(self):
+        left = Matrix([[r * 5 + c for c in range(5)] for r in range(3)])
+        right = Matrix([[r - c for c in range(7)] for r in range(5)])
+        expected = Matrix([
+            [sum(left[r, k] * right[k, c] for k in range(5)) for c in range(7)]
+            for r in range(3)
+        ])
+        block_columns = matrixlib.MATMUL_BLOCK_COLUMNS
+        try:
+            # columns are multiplied by several blocks, the last one is not full
+            matrixlib.MATMUL_BLOCK_COLUMNS = 3
+            self.assertEqual(left @ right, expected)
+        finally:
+            matrixlib.MATMUL_BLOCK_COLUMNS = block_columns
+        self.assertEqual(left @ right, expected)
+        with self.assertRaises(IndexError):
+            right @ left
+
+    @skipUnless(matrixlib.numpy, 'NumPy is not installed')
+    def test_numpy_backend(self):
+        rand = random.Random(0)
+        left = Matrix([[rand.uniform(-10, 10) for _ in range(20)] for _ in range(30)])
+        right = Matrix([[rand.uniform(-10, 10) for _ in range(30)] for _ in range(20)])
+        operations = [
+            lambda: left + 1.7, lambda: 3 * left, lambda: left - left * 0.3,
+            lambda: left @ right, lambda: left.transpose(), lambda: right.transpose() + left,
+        ]
+        backend = matrixlib.BACKEND
+        try:
+            results = {}
+            for matrixlib.BACKEND in (matrixlib.PythonBackend, matrixlib.NumpyBackend):
+                results[matrixlib.BACKEND.name] = [operation() for operation in operations]
+                with self.assertRaises(IndexError):
+                    left + right
+                with self.assertRaises(IndexError):
+                    left @ left
+        finally:
+            matrixlib.BACKEND = backend
+        for python, numpy in zip(results['python'], results['numpy']):
+            self.assertEqual(python.size, numpy.size)
+            for a, b in zip(python._data, numpy._data):
+                self.assertAlmostEqual(a, b, delta=abs(a) * 1e-6)
+        # elementwise operations give the same float32 elements
+        self.assertEqual(results['python'][:3], results['numpy'][:3])
+
+    def test_power_by_squaring(self):
+        m = Matrix([[1, 1, 0], [0, 1, 1], [1, 0, 1]])
+        expected = Matrix.even(3)
+        for power in range(13):
+            self.assertEqual(m ** power, expected)
+            expected = expected @ m
+        # base matrix is not changed by squaring
+        self.assertEqual(m, Matrix([[1, 1, 0], [0, 1, 1], [1, 0, 1]]))
+        m **= 5
+        self.assertEqual(m, Matrix([[11, 10, 11], [11, 11, 10], [10, 11, 11]]))
+
+    def test_power_modulo(self):
+        modulo = 10 ** 9 + 7
+        fibonacci = Matrix([[1, 1], [1, 0]])
+        a, b = 0, 1
+        for _ in range(1000):
+            a, b = b, a + b
+        self.assertEqual(pow(fibonacci, 1000, modulo)[0, 1], a % modulo)
+        self.assertEqual(pow(fibonacci, 1000, modulo)._data.typecode, 'q')
+        self.assertEqual(pow(fibonacci, 0, modulo), Matrix.even(2))
+        self.assertEqual(pow(fibonacci, 0, 1), Matrix.zero(2, 2))
+        self.assertEqual(pow(Matrix([[3, -5], [7, 2]]), 3, 10),
+                         Matrix([[v % 10 for v in row] for row in [[-253, 80], [-112, -237]]]))
+        with self.assertRaises(TypeError):
+            pow(fibonacci, 2, 2.5)
+        with self.assertRaises(ValueError):
+            pow(fibonacci, 2, 0)
+        with self.assertRaises(ValueError):
+            pow(fibonacci, 1001, 2 ** 64 + 13)
+        self.assertEqual(pow(fibonacci, 1, 2 ** 63)[0, 0], 1)
+        self.assertEqual(pow(fibonacci, 1, -2 ** 63)[0, 0], 1 - 2 ** 63)
+        with self.assertRaises(TypeError):
+            pow(Matrix([[1.5, 1], [1, 0]]), 2, 7)
+        with self.assertRaises(ValueError):
+            pow(self.matrices[10], 2, 7)
+
+        # elements of integer result can be set, not integer ones make it float
+        result = pow(fibonacci, 10, 1000)
+        result[0, 1] = 2.0
+        result[1] = [3, 4]
+        self.assertEqual(result, Matrix([[89, 2], [3, 4]]))
+        self.assertEqual(result._data.typecode, 'q')
+        result[0, 0] = 1.5
+        self.assertEqual(result, Matrix([[1.5, 2], [3, 4]]))
+        result = pow(fibonacci, 10, 1000)
+        result[1] = [0.5, 1]
+        self.assertEqual(result, Matrix([[89, 55], [0.5, 1]]))
+        with self.assertRaises(TypeError):
+            result[0] = [[1, 0], [1, 0]]
+
+    def test_slice_views(self):
+        m = Matrix([[r * 10 + c for c in range(5)] for r in range(4)])
+        view = m[1:4, ::2]
+        self.assertIs(view._data, m._data)
+        self.assertEqual(view, Matrix([[10, 12, 14], [20, 22, 24], [30, 32, 34]]))
+        self.assertEqual(view[::-1, 1:], Matrix([[32, 34], [22, 24], [12, 14]]))
+        self.assertEqual(view[::-1, 1:]._data, m._data)
+        self.assertEqual(view.transpose(), Matrix([[10, 20, 30], [12, 22, 32], [14, 24, 34]]))
+        self.assertEqual(m[2], Matrix([[20, 21, 22, 23, 24]]))
+        self.assertEqual(m[-1, 4], 34)
+        # setting elements of view changes matrix and vice versa
+        view[0, 1] = -1
+        view[2] = [7, 8, 9]
+        self.assertEqual(m[1, 2], -1)
+        self.assertEqual(m[3], Matrix([[7, 31, 8, 33, 9]]))
+        m[2, 4] = 100
+        self.assertEqual(view[1, 2], 100)
+        # copy has its own elements
+        copy = view.copy()
+        copy[0, 0] = 0
+        self.assertEqual(m[1, 0], 10)
+        self.assertIsNot(copy._data, m._data)
+        self.assertEqual(copy + view, view * 2 - Matrix([[10, 0, 0], [0, 0, 0], [0, 0, 0]]))
+        # in-place operators don't change views
+        view += 1
+        self.assertEqual(m[1, 0], 10)
+        with self.assertRaises(IndexError):
+            view[3, 0]
@@ -1,30 +1,309 @@
+"""Search of regular expression in files: engine and fast entry point.
+
+Only modules needed for plain search are imported at start. Click,
+process pool, decompressors and hashing are imported by the code, that
+uses them, so short runs (e.g. from shell loops) start fast. Command line
+interface is in the_searcher_cli.py and is imported only if needed.
+
+Usage:
+    python3 -m the_searcher -c PATTERN FILE
+    python3 the_searcher.py --help
+"""
+import codecs
+import copy
+import heapq
+import importlib
+import io
+import locale
+import math
+import mmap
+import os
 import re
-import click
-from collections import Counter
+import sys
+import time
+from collections import Counter, deque, namedtuple
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache, partial
+from itertools import chain, groupby, islice
 from operator import itemgetter
 
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
 
-help_strings = {
-    '-u': 'List unique matches only.',
-    '-c': 'Total count of found matches.',
-    '-uc': 'Total count of unique matches.',
-    '-l': 'Total count of lines, where at least one match was found.',
-    '-s': 'Sorting of found matches by alphabet and frequency (related to all found matches)',
-    '-o': 'Sorting order can be specified (ascending, descending).',
-    '-n': 'List first N matches.',
-    '--stat': 'List unique matches with statistic (count or frequency in percents).',
-}
+
+# count of compiled patterns kept by compile_pattern
+PATTERN_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def compile_pattern(pattern, flags=0):
+    """Compiled regular expression for pattern.
+
+    Compiled objects are cached by pattern and flags, so library
+    callers that search with many patterns compile each of them once.
+    Already compiled pattern is returned as is.
+
+    Args:
+        pattern(str or re.Pattern): regular expression.
+        flags(int): flags of re module.
+
+    Returns:
+        re.Pattern: compiled regular expression.
+    """
+    return re.compile(pattern, flags)
 
 
 def count_lines_with_matches(pattern, text_lines):
-    lines_count = 0
-    for t in text_lines:
-        print(re.search(pattern, t))
-        if re.search(pattern, t):
-            print()
-            lines_count += 1
-    # save total count of LINES
-    return lines_count
+    """Count of lines of text with at least one match of pattern.
+
+    Search of each line stops at its first match, lines without
+    required literal are skipped without running regex.
+    """
+    regex = compile_pattern(pattern)
+    literal = required_literal(regex)
+    if literal:
+        text_lines = (line for line in text_lines if literal in line)
+    return sum(map(bool, map(regex.search, text_lines)))
+
+
+def count_matches_in_lines(pattern, text_lines):
+    """Count of matches of pattern in lines of text.
+
+    Matches are counted without creating their strings (see _counting_pattern).
+    """
+    regex = compile_pattern(pattern)
+    counting = _counting_pattern(regex)
+    if counting is None:
+        return count_matches(search_lines(regex, text_lines))
+    literal = required_literal(regex)
+    if literal:
+        text_lines = (line for line in text_lines if literal in line)
+    return sum(map(len, map(counting.findall, text_lines)))
+
+
+class Profile:
+    """Per-stage wall time and counters of search (--profile).
+
+    Time of stage is exclusive: time of nested stage (e.g. reading of
+    block, pulled by matching) is counted only for the nested one.
+    Stages are timed by blocks, batches or items of streams, so
+    the hot loops are not changed, and nothing is timed while
+    module PROFILE is None.
+    """
+    def __init__(self):
+        self.stages = Counter()
+        self.counters = Counter()
+        self._stack = []
+        self._started = self._switched = time.perf_counter()
+
+    def _switch(self):
+        now = time.perf_counter()
+        if self._stack:
+            self.stages[self._stack[-1]] += now - self._switched
+        self._switched = now
+
+    @contextmanager
+    def stage(self, name):
+        """Time the block of code as stage."""
+        self._switch()
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._switch()
+            self._stack.pop()
+
+    def iterate(self, name, iterable, counters=()):
+        """Time taking of items of iterable as stage.
+
+        Args:
+            counters(tuple): pairs of name of counter and function of item,
+                that returns increment of counter.
+        """
+        iterator = iter(iterable)
+        stack = self._stack
+        stages = self.stages
+        perf_counter = time.perf_counter
+        while True:
+            # inlined stage(name), it runs for every item
+            now = perf_counter()
+            if stack:
+                stages[stack[-1]] += now - self._switched
+            stack.append(name)
+            self._switched = now
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                now = perf_counter()
+                stages[name] += now - self._switched
+                stack.pop()
+                self._switched = now
+            for counter, increment in counters:
+                self.counters[counter] += increment(item)
+            yield item
+
+    def report(self):
+        """Stages and counters as JSON compatible dict."""
+        self._switch()
+        total = time.perf_counter() - self._started
+        stages = {name: round(seconds, 6) for name, seconds in self.stages.items()}
+        stages['other'] = round(max(total - sum(self.stages.values()), 0), 6)
+        return {
+            'total_seconds': round(total, 6),
+            'stages': stages,
+            'counters': dict(self.counters),
+        }
+
+
+# profile of current search, None if it is disabled
+PROFILE = None
+
+
+def profile_stage(name):
+    """Context of stage of PROFILE, does nothing if profiling is disabled."""
+    if PROFILE is None:
+        return nullcontext()
+    return PROFILE.stage(name)
+
+
+def _block_size(block):
+    if isinstance(block, list):
+        return sum(map(len, block))
+    buffer, start, end, _ = block
+    return end - start
+
+
+def _block_lines(block):
+    if isinstance(block, list):
+        return len(block)
+    buffer, start, end, _ = block
+    return buffer[start:end].count(b'\n')
+
+
+def read_blocks(blocks):
+    """Blocks of lines (see file_blocks), timed as 'read' with PROFILE."""
+    if PROFILE is None:
+        return blocks
+    return PROFILE.iterate('read', blocks, (('bytes_read', _block_size), ('lines', _block_lines)))
+
+
+def matching(found):
+    """Per-line matches of block of lines, timed as 'match' with PROFILE.
+
+    With PROFILE matches of block are found at once, so the time is
+    taken once per block.
+    """
+    if PROFILE is None:
+        return found
+    with PROFILE.stage('match'):
+        found = list(found)
+    PROFILE.counters['matches'] += sum(map(len, found))
+    return found
+
+
+# count of output lines written by one call
+OUTPUT_BATCH_SIZE = 8192
+
+
+def echo_lines(lines):
+    """Print lines to stdout by large blocks instead of one by one.
+
+    Broken pipe (e.g. output piped to head) stops printing and
+    is handled by main or by click.
+    """
+    lines = iter(lines)
+    while True:
+        batch = list(islice(lines, OUTPUT_BATCH_SIZE))
+        if not batch:
+            break
+        batch.append('')
+        with profile_stage('output'):
+            text = '\n'.join(map(str, batch))
+            sys.stdout.write(text)
+            sys.stdout.flush()
+        if PROFILE is not None:
+            PROFILE.counters['output_chars'] += len(text)
+
+
+# memory (bytes) of items sorted at once, larger sets are sorted by runs on disk
+SORT_MEMORY_LIMIT = 1 << 28
+
+# count of items pickled at once into run of external sort
+SORT_RUN_BATCH_SIZE = 4096
+
+
+def _item_size(item):
+    """Approximate memory of (match, count) item in sorted list."""
+    return sys.getsizeof(item) + sys.getsizeof(item[0]) + 8
+
+
+def _write_run(items):
+    """Temporary file with pickled sorted items, read by _read_run."""
+    import pickle
+    import tempfile
+
+    run = tempfile.TemporaryFile()
+    for start in range(0, len(items), SORT_RUN_BATCH_SIZE):
+        pickle.dump(items[start:start + SORT_RUN_BATCH_SIZE], run, pickle.HIGHEST_PROTOCOL)
+    run.seek(0)
+    return run
+
+
+def _read_run(run):
+    import pickle
+
+    with run:
+        while True:
+            try:
+                batch = pickle.load(run)
+            except EOFError:
+                return
+            yield from batch
+
+
+def sorted_items(items, key, reverse=False, memory_limit=None):
+    """Sorted items, like sorted, but memory of sorted items is limited.
+
+    Items are sorted in memory while they take less than memory_limit
+    (SORT_MEMORY_LIMIT by default). Larger input is split into sorted
+    runs in temporary files, merged lazily by heapq.merge. Sort is
+    stable in both cases.
+
+    Returns:
+        Iterable: sorted items.
+    """
+    memory_limit = SORT_MEMORY_LIMIT if memory_limit is None else memory_limit
+    items = iter(items)
+    runs = []
+    while True:
+        with profile_stage('sort'):
+            chunk = []
+            size = 0
+            for item in items:
+                chunk.append(item)
+                size += _item_size(item)
+                if size >= memory_limit:
+                    break
+            chunk.sort(key=key, reverse=reverse)
+            if not runs and size < memory_limit:
+                # all items fit in memory
+                return chunk
+            if chunk:
+                runs.append(_write_run(chunk))
+            if size < memory_limit:
+                break
+        del chunk
+
+    merged = heapq.merge(*map(_read_run, runs), key=key, reverse=reverse)
+    if PROFILE is not None:
+        return PROFILE.iterate('sort', merged)
+    return merged
 
 
 def output_stat_with_sorting_options(
@@ -32,124 +311,1775 @@ def output_stat_with_sorting_options(
         matches,
         stat='count',
         flag_s=None,
-        flag_o=None
+        flag_o=None,
+        memory_limit=None,
 ):
     """"""
     # check if sorted output intended
     if flag_s or flag_o:
-        data = sorted(
+        data = sorted_items(
             data,
             key=itemgetter(flag_s == 'freq'),
-            reverse=(flag_o == 'desc')
+            reverse=(flag_o == 'desc'),
+            memory_limit=memory_limit,
         )
 
-    for st in data:
-        if stat == 'freq':
-            click.echo('{: >15} | {: >5}'.format(st[0], st[1] / matches))
-        else:
-            click.echo('{: >15} | {: >5}'.format(st[0], st[1]))
+    line = '{: >15} | {: >5}'.format
+    if stat == 'freq':
+        echo_lines(line(st[0], st[1] / matches) for st in data)
+    else:
+        echo_lines(line(st[0], st[1]) for st in data)
 
 
 def output_data_with_sorting_options(
         data,
         flag_s=None,
-        flag_o=None
+        flag_o=None,
+        memory_limit=None,
 ):
     """"""
-    sorted_data = sorted(
+    sorted_data = sorted_items(
         data,
         key=itemgetter(flag_s == 'freq'),
-        reverse=(flag_o == 'desc')
+        reverse=(flag_o == 'desc'),
+        memory_limit=memory_limit,
     )
-    for d in sorted_data:
-        click.echo(d[0])
+    echo_lines(map(itemgetter(0), sorted_data))
 
 
 def output_data(data):
     """
     """
-    for d in data:
-        click.echo(d)
+    echo_lines(data)
+
+
+def search_lines(pattern, text_lines):
+    """Lazily search every line of text for pattern.
+
+    Lines are read one by one, so nothing but the current line
+    is kept in memory. Pattern is compiled once, the loop only calls
+    bound findall of compiled pattern. If pattern has required literal,
+    lines without it are skipped without running regex.
+
+    Args:
+        pattern(str or re.Pattern): regular expression.
+        text_lines(Iterable[str]): lines of text.
+
+    Yields:
+        list: all matches of the line, only for lines with at least one match
+    """
+    regex = compile_pattern(pattern)
+    findall = regex.findall
+    literal = required_literal(regex)
+    if literal:
+        text_lines = (line for line in text_lines if literal in line)
+    for line in text_lines:
+        matches = findall(line)
+        if matches:
+            yield matches
+
+
+# size of part of memory-mapped file searched by one regex call
+MMAP_CHUNK_SIZE = 1 << 24
+
+# encodings, where ASCII text is encoded byte to byte
+ASCII_COMPATIBLE_ENCODINGS = {'ascii', 'utf-8'}
+
+# bytes, that are handled the same way by bytes and text search: ASCII except
+# universal newlines and extra unicode whitespaces (\r, \x1c-\x1f)
+PLAIN_ASCII = bytes(set(range(0x80)) - {0x0d, 0x1c, 0x1d, 0x1e, 0x1f})
+
+
+def is_plain_ascii(buffer, start=0, end=None):
+    """Check if buffer[start:end] has only PLAIN_ASCII bytes.
+
+    Deleting of plain bytes by translate is much faster than regex search
+    of the other ones.
+    """
+    return not buffer[start:end].translate(None, PLAIN_ASCII)
+
+# position assertions, that do not depend on line boundaries
+LINE_SAFE_AT_CODES = {sre_constants.AT_BOUNDARY, sre_constants.AT_NON_BOUNDARY}
+
+# character categories, that contain newline
+NEWLINE_CATEGORIES = {
+    sre_constants.CATEGORY_SPACE,
+    sre_constants.CATEGORY_NOT_DIGIT,
+    sre_constants.CATEGORY_NOT_WORD,
+    sre_constants.CATEGORY_LINEBREAK,
+}
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def bytes_pattern(regex):
+    """Bytes twin of compiled text pattern.
+
+    Bytes pattern gives the same matches as text one on plain ASCII data,
+    so it can search raw file content without decoding.
+
+    Returns:
+        re.Pattern: compiled bytes pattern or None if pattern is not ASCII.
+    """
+    try:
+        return re.compile(regex.pattern.encode('ascii'), regex.flags & ~re.UNICODE)
+    except (UnicodeEncodeError, re.error):
+        return None
+
+
+def _can_match_newline(items):
+    """Check if any item of character class [...] matches newline."""
+    negate = False
+    matches = False
+    for op, av in items:
+        if op is sre_constants.NEGATE:
+            negate = True
+        elif op is sre_constants.LITERAL:
+            matches |= av == ord('\n')
+        elif op is sre_constants.RANGE:
+            matches |= av[0] <= ord('\n') <= av[1]
+        elif op is sre_constants.CATEGORY:
+            matches |= av in NEWLINE_CATEGORIES
+        else:
+            # unknown item, be pessimistic
+            return True
+    return matches != negate
+
+
+def _is_line_bound(subpattern, dotall):
+    """Recursive check of parsed pattern for is_line_bound."""
+    for op, av in subpattern:
+        if op is sre_constants.LITERAL:
+            if av == ord('\n'):
+                return False
+        elif op is sre_constants.NOT_LITERAL:
+            if av != ord('\n'):
+                return False
+        elif op is sre_constants.ANY:
+            if dotall:
+                return False
+        elif op is sre_constants.IN:
+            if _can_match_newline(av):
+                return False
+        elif op is sre_constants.AT:
+            if av not in LINE_SAFE_AT_CODES:
+                return False
+        elif op is sre_constants.SUBPATTERN:
+            _, add_flags, del_flags, p = av
+            inner = (dotall or bool(add_flags & re.DOTALL)) \
+                and not del_flags & re.DOTALL
+            if not _is_line_bound(p, inner):
+                return False
+        elif op is sre_constants.BRANCH:
+            if not all(_is_line_bound(p, dotall) for p in av[1]):
+                return False
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT,
+                    getattr(sre_constants, 'POSSESSIVE_REPEAT', None)):
+            if not _is_line_bound(av[2], dotall):
+                return False
+        elif op is getattr(sre_constants, 'ATOMIC_GROUP', None):
+            if not _is_line_bound(av, dotall):
+                return False
+        elif op is sre_constants.GROUPREF_EXISTS:
+            if not all(_is_line_bound(p, dotall) for p in av[1:] if p):
+                return False
+        elif op is not sre_constants.GROUPREF:
+            # lookarounds and everything unknown
+            return False
+    return True
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def is_line_bound(regex):
+    """Check if pattern gives the same matches for the whole text and for each line of it.
+
+    It is true when pattern can't match newline or empty string and
+    doesn't look at line boundaries (no ^, $, \\A, \\Z and lookarounds).
+    Such pattern can search many lines at once.
+    """
+    parsed = sre_parse.parse(regex.pattern, regex.flags)
+    if parsed.getwidth()[0] == 0:
+        return False
+    return _is_line_bound(parsed, bool(regex.flags & re.DOTALL))
+
+
+def _required_literals(subpattern, ignore_case):
+    """Recursive search of literals for required_literal."""
+    literals = list()
+    run = list()
+    for op, av in subpattern:
+        if op is sre_constants.LITERAL and not ignore_case:
+            run.append(chr(av))
+            continue
+
+        if run:
+            literals.append(''.join(run))
+            run = list()
+
+        if op is sre_constants.SUBPATTERN:
+            _, add_flags, del_flags, p = av
+            inner = (ignore_case or bool(add_flags & re.IGNORECASE)) \
+                and not del_flags & re.IGNORECASE
+            literals.extend(_required_literals(p, inner))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT,
+                    getattr(sre_constants, 'POSSESSIVE_REPEAT', None)):
+            # body of repeat is required only if it repeats at least once
+            if av[0] > 0:
+                literals.extend(_required_literals(av[2], ignore_case))
+        elif op is getattr(sre_constants, 'ATOMIC_GROUP', None):
+            literals.extend(_required_literals(av, ignore_case))
+    if run:
+        literals.append(''.join(run))
+    return literals
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def required_literals(regex):
+    """Literal strings, that are parts of every match of regex.
+
+    E.g. ['ERROR ', ' in '] for 'ERROR \\d+ in \\w+'. Text without any
+    of them can't have matches, so it can be skipped by fast substring search.
+
+    Returns:
+        tuple: literals of str, even for bytes pattern.
+    """
+    try:
+        parsed = sre_parse.parse(regex.pattern, regex.flags)
+    except re.error:
+        return tuple()
+    return tuple(_required_literals(parsed, bool(regex.flags & re.IGNORECASE)))
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def required_literal(regex):
+    """The longest of required_literals.
+
+    Returns:
+        str or bytes: literal of the same type as pattern, or None.
+    """
+    literals = required_literals(regex)
+    if not literals:
+        return None
+    literal = max(literals, key=len)
+    if isinstance(regex.pattern, bytes):
+        return literal.encode('latin-1')
+    return literal
+
+
+def _decode_found(found):
+    """Decodes item of findall result of bytes pattern."""
+    if isinstance(found, tuple):
+        return tuple(g.decode('ascii') for g in found)
+    return found.decode('ascii')
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def _counting_pattern(regex, lines=False):
+    """Pattern, whose findall gives an empty string for every match of regex.
+
+    With lines=True the match goes on to the end of line, so there is
+    one empty string for every line with a match (regex must be line bound).
+    Empty strings are not allocated, so matches are counted by len
+    of findall without creating their strings.
+
+    Returns:
+        re.Pattern: compiled pattern of the same type or None if it can't be built.
+    """
+    suffix = r')[^\n]*()' if lines else ')()'
+    if isinstance(regex.pattern, bytes):
+        pattern = b'(?:' + regex.pattern + suffix.encode()
+    else:
+        pattern = '(?:' + regex.pattern + suffix
+    try:
+        return re.compile(pattern, regex.flags)
+    except re.error:
+        # e.g. global inline flags or verbose comment at the end
+        return None
+
+
+def count_matched_lines(regex, buffer, start, end):
+    """Count of lines of buffer[start:end] with a match of line bound regex."""
+    line_pattern = _counting_pattern(regex, lines=True)
+    if line_pattern is not None:
+        return len(line_pattern.findall(buffer, start, end))
+    lines_count = 0
+    line_end = start
+    for match in regex.finditer(buffer, start, end):
+        if match.start() >= line_end:
+            lines_count += 1
+            line_end = buffer.find(b'\n', match.start(), end)
+            line_end = end if line_end == -1 else line_end
+    return lines_count
+
+
+class ChunkMatches(list):
+    """Matches of several lines of chunk, found by one regex call.
+
+    Count of lines with matches is found only on demand (for -l),
+    while the chunk is still available.
+    """
+    def __init__(self, matches, regex, buffer, start, end):
+        super().__init__(matches)
+        self._regex = regex
+        self._buffer = buffer
+        self._start = start
+        self._end = end
+
+    @property
+    def lines(self):
+        return count_matched_lines(self._regex, self._buffer, self._start, self._end)
+
+
+# size of blocks of chunk, checked for required literal
+PREFILTER_BLOCK_SIZE = 1 << 16
+
+
+def _search_chunk_at_once(regex, buffer, start, end):
+    """Search all lines of buffer[start:end] by one findall call.
+
+    Regex must be line bound, so no match goes through newline.
+    If regex has required literal, only blocks of lines containing it
+    are searched. Only found matches are decoded.
+    """
+    literal = required_literal(regex)
+    if literal is None:
+        matches = regex.findall(buffer, start, end)
+    else:
+        matches = list()
+        for block_start, block_end in line_ranges(buffer, start, end, PREFILTER_BLOCK_SIZE):
+            if buffer.find(literal, block_start, block_end) != -1:
+                matches += regex.findall(buffer, block_start, block_end)
+    if not matches:
+        return None
+    with profile_stage('decode'):
+        if regex.groups:
+            matches = [_decode_found(m) for m in matches]
+        else:
+            # matches don't contain newlines, so they can be decoded at once
+            matches = b'\n'.join(matches).decode('ascii').split('\n')
+    return ChunkMatches(matches, regex, buffer, start, end)
+
+
+def line_ranges(buffer, start, end, chunk_size):
+    """Split buffer[start:end] into (start, end) parts of whole lines.
+
+    Parts are about chunk_size bytes, longer only for longer lines.
+
+    Start must be the beginning of line.
+    """
+    while start < end:
+        chunk_end = start + chunk_size
+        if chunk_end < end:
+            # move end of chunk to the nearest line end
+            chunk_end = buffer.rfind(b'\n', start, chunk_end) + 1 \
+                or buffer.find(b'\n', chunk_end, end) + 1 \
+                or end
+        else:
+            chunk_end = end
+        yield start, chunk_end
+        start = chunk_end
+
+
+def search_buffer(regex, buffer, start, end, encoding):
+    """Search whole lines of buffer[start:end].
+
+    If pattern is line bound and lines are plain ASCII, they are searched
+    at once by bytes pattern and only found matches are decoded.
+    Otherwise lines are decoded and searched as text line by line.
+
+    Args:
+        regex(re.Pattern): compiled text pattern.
+        buffer(bytes or mmap.mmap): raw text.
+        start(int): offset of the first line to search.
+        end(int): offset after the last line to search.
+        encoding(str): ASCII compatible encoding of text.
+
+    Yields:
+        list: all matches of the line or ChunkMatches of several lines
+    """
+    bregex = bytes_pattern(regex) if is_line_bound(regex) else None
+    if bregex is not None and is_plain_ascii(buffer, start, end):
+        matches = _search_chunk_at_once(bregex, buffer, start, end)
+        if matches:
+            yield matches
+    else:
+        text = io.TextIOWrapper(io.BytesIO(buffer[start:end]), encoding=encoding)
+        yield from search_lines(regex, text)
+
+
+def count_buffer(regex, kind, buffer, start, end, encoding):
+    """Count of matches ('count') or of lines with matches ('lines') of buffer[start:end].
+
+    Lines are searched like by search_buffer, but strings of matches
+    are not created and decoded.
+    """
+    bregex = bytes_pattern(regex)
+    plain = bregex is not None and is_plain_ascii(buffer, start, end)
+    if not plain or not is_line_bound(regex):
+        if plain and required_literal(regex) is None:
+            # bytes twin gives the same matches for plain ASCII lines and it is
+            # faster, but text lines are faster filtered by literal
+            regex, lines = bregex, buffer[start:end].splitlines(keepends=True)
+        else:
+            lines = io.TextIOWrapper(io.BytesIO(buffer[start:end]), encoding=encoding)
+        if kind == 'lines':
+            return count_lines_with_matches(regex, lines)
+        return count_matches_in_lines(regex, lines)
+
+    # only blocks of lines with required literal are searched at once
+    literal = required_literal(bregex)
+    if literal is None:
+        ranges = [(start, end)]
+    else:
+        ranges = [(block_start, block_end) for block_start, block_end
+                  in line_ranges(buffer, start, end, PREFILTER_BLOCK_SIZE)
+                  if buffer.find(literal, block_start, block_end) != -1]
+    if kind == 'lines':
+        return sum(count_matched_lines(bregex, buffer, *part) for part in ranges)
+    findall = (_counting_pattern(bregex) or bregex).findall
+    return sum(len(findall(buffer, *part)) for part in ranges)
+
+
+def mapped_file_blocks(filename, encoding=None, start=0, end=None):
+    """Blocks of lines of regular file, mapped into memory.
+
+    Args:
+        filename(str): path of regular file.
+        encoding(str): encoding of file, locale encoding by default.
+        start(int): offset of the first line.
+        end(int): offset after the last line, end of file by default.
+
+    Yields:
+        tuple: buffer, start, end and encoding of block for search_buffer.
+        Buffer is valid only until the next block is taken.
+    """
+    encoding = encoding or locale.getpreferredencoding(False)
+
+    with open(filename, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        end = size if end is None else min(end, size)
+        if start >= end:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            for chunk_start, chunk_end in line_ranges(buffer, start, end, MMAP_CHUNK_SIZE):
+                yield buffer, chunk_start, chunk_end, encoding
+
+
+def search_mapped_file(regex, filename, encoding=None, start=0, end=None):
+    """Search lines of regular file, mapped into memory.
+
+    File is searched by chunks of lines with search_buffer.
+    Matches are the same as for search_lines, but matches of several lines
+    can be grouped into one ChunkMatches item.
+
+    Args:
+        regex(re.Pattern): compiled text pattern.
+        filename(str): path of regular file.
+        encoding(str): encoding of file, locale encoding by default.
+        start(int): offset of the first line to search.
+        end(int): offset after the last line to search, end of file by default.
+
+    Yields:
+        list: all matches of the line or ChunkMatches of several lines
+    """
+    for block in mapped_file_blocks(filename, encoding, start, end):
+        yield from search_buffer(regex, *block)
+
+
+# modules of compressed files by patterns of their magic bytes
+COMPRESSED_FORMATS = {
+    re.compile(rb'\x1f\x8b'): 'gzip',
+    # text can start with BZh too, so block size and magic of the first
+    # block (or of the end of empty stream) are checked
+    re.compile(rb'BZh[1-9](?:1AY&SY|\x17rE8P\x90)'): 'bz2',
+    re.compile(rb'\xfd7zXZ\x00'): 'lzma',
+}
+
+# count of bytes of file, checked by COMPRESSED_FORMATS
+MAGIC_SIZE = 10
+
+# size of block read from decompressor at once
+DECOMPRESS_BLOCK_SIZE = 1 << 20
+
+# count of decompressed blocks, that can wait for search
+DECOMPRESS_QUEUE_SIZE = 8
+
+
+def compressed_opener(filename):
+    """Opener of compressed regular file (gzip, bz2 or xz), None for other files."""
+    if not os.path.isfile(filename):
+        return None
+    with open(filename, 'rb') as f:
+        magic = f.read(MAGIC_SIZE)
+    for prefix, module in COMPRESSED_FORMATS.items():
+        if prefix.match(magic):
+            return importlib.import_module(module).open
+    return None
+
+
+def decompressed_blocks(filename, opener):
+    """Blocks of whole lines of decompressed file.
+
+    Decompression runs in a separate thread (decompressors release GIL),
+    while the caller searches previous blocks. Only a few blocks are
+    decompressed ahead.
+
+    Yields:
+        bytes: block of whole lines, the last one can have no newline.
+    """
+    import queue
+    import threading
+
+    blocks = queue.Queue(maxsize=DECOMPRESS_QUEUE_SIZE)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                blocks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def decompress():
+        try:
+            with opener(filename, 'rb') as f:
+                for block in iter(partial(f.read, DECOMPRESS_BLOCK_SIZE), b''):
+                    put(block)
+                    if stop.is_set():
+                        return
+        except Exception as e:
+            put(e)
+        put(None)
+
+    thread = threading.Thread(target=decompress, daemon=True)
+    thread.start()
+    try:
+        rest = b''
+        while True:
+            block = blocks.get()
+            if block is None:
+                break
+            if isinstance(block, Exception):
+                raise block
+
+            block = rest + block
+            lines_end = block.rfind(b'\n') + 1
+            rest = block[lines_end:]
+            if lines_end:
+                yield block[:lines_end]
+        if rest:
+            yield rest
+    finally:
+        stop.set()
+        thread.join()
+
+
+def search_compressed_file(regex, filename, opener, encoding=None):
+    """Search lines of compressed file, decompressed on the fly.
+
+    Yields:
+        list: all matches of the line or ChunkMatches of several lines
+    """
+    encoding = encoding or locale.getpreferredencoding(False)
+    for block in decompressed_blocks(filename, opener):
+        yield from search_buffer(regex, block, 0, len(block), encoding)
+
+
+# count of lines of text block
+TEXT_BLOCK_LINES = 1024
+
+
+def text_blocks(text_lines):
+    """Split stream of lines of text into lists of TEXT_BLOCK_LINES lines."""
+    text_lines = iter(text_lines)
+    return iter(lambda: list(islice(text_lines, TEXT_BLOCK_LINES)), [])
+
+
+def ascii_compatible_locale():
+    """Check if locale encoding encodes ASCII text byte to byte."""
+    encoding = codecs.lookup(locale.getpreferredencoding(False)).name
+    return encoding in ASCII_COMPATIBLE_ENCODINGS
+
+
+def can_map_file(filename):
+    """Check if file can be searched through memory mapping."""
+    return os.path.isfile(filename) and ascii_compatible_locale() \
+        and compressed_opener(filename) is None
+
+
+def file_blocks(filename):
+    """Blocks of lines of file, read with the fastest available way.
+
+    Regular files in ASCII compatible encoding are mapped into memory,
+    compressed files are decompressed on the fly, other ones
+    (pipes, devices, etc.) are read as text.
+
+    Yields:
+        tuple or list: raw block for search_buffer or list of lines of text,
+        see search_block. Block is valid only until the next one is taken.
+    """
+    opener = compressed_opener(filename)
+    if opener is not None:
+        if ascii_compatible_locale():
+            encoding = locale.getpreferredencoding(False)
+            for block in decompressed_blocks(filename, opener):
+                yield block, 0, len(block), encoding
+        else:
+            with opener(filename, 'rt') as text_lines:
+                yield from text_blocks(text_lines)
+    elif can_map_file(filename):
+        yield from mapped_file_blocks(filename)
+    else:
+        with open(filename, 'r') as text_lines:
+            yield from text_blocks(text_lines)
+
+
+def search_block(regex, block):
+    """Search block of lines, taken from file_blocks.
+
+    Yields:
+        list: all matches of the line or ChunkMatches of several lines
+    """
+    if isinstance(block, list):
+        return matching(search_lines(regex, block))
+    return matching(search_buffer(regex, *block))
+
+
+# kinds of summaries, that are counted without strings of matches
+COUNT_KINDS = ('count', 'lines')
+
+
+def count_block(regex, kind, block):
+    """Count of matches ('count') or of lines with matches ('lines') of block of lines.
+
+    Args:
+        block(tuple or list): block of lines, taken from file_blocks.
+    """
+    with profile_stage('match'):
+        if isinstance(block, list):
+            if kind == 'lines':
+                counted = count_lines_with_matches(regex, block)
+            else:
+                counted = count_matches_in_lines(regex, block)
+        else:
+            counted = count_buffer(regex, kind, *block)
+    if PROFILE is not None:
+        PROFILE.counters['matches' if kind == 'count' else 'matched_lines'] += counted
+    return counted
+
+
+def count_blocks(regex, kind, blocks):
+    """Total count of matches ('count') or of lines with matches ('lines') of blocks."""
+    return sum(count_block(regex, kind, block) for block in blocks)
+
+
+def search_file(regex, filename):
+    """Search lines of file with the fastest available way (see file_blocks).
+
+    Yields:
+        list: all matches of the line or ChunkMatches of several lines
+    """
+    for block in read_blocks(file_blocks(filename)):
+        yield from search_block(regex, block)
+
+
+def input_files(paths):
+    """Files of paths, directories are walked recursively in sorted order."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        else:
+            yield path
 
 
-@click.command()
-@click.argument('pattern')
-@click.argument('filename', type=click.Path(exists=True), required=False)
-@click.option('-u', 'flag_u', is_flag=True, help=help_strings['-u'])
-@click.option('-c', 'flag_c', is_flag=True, help=help_strings['-c'])
-@click.option('-l', 'flag_l', is_flag=True, help=help_strings['-l'])
-@click.option('-s', 'flag_s', type=click.Choice(['abc', 'freq']), help=help_strings['-s'])
-@click.option('-o', 'flag_o', type=click.Choice(['asc', 'desc']), help=help_strings['-o'])
-@click.option('-n', 'flag_n', default=None, help=help_strings['-n'], type=int)
-@click.option('--stat', 'stat', type=click.Choice(['count', 'freq']), help=help_strings['--stat'])
-def searcher(pattern, filename, flag_u, flag_c, flag_l, flag_s, flag_o, flag_n, stat):
+def search_files(regex, paths):
+    """Search all files of paths one by one.
+
+    Yields:
+        list: all matches of the line or ChunkMatches of several lines
     """
+    for filename in input_files(paths):
+        yield from search_file(regex, filename)
+
+
+# path of standard input in records
+STDIN_PATH = '(standard input)'
+
+# record of one match: path of file, number of line (from 1), offset of line
+# in bytes and span - (start, end) offsets of match in bytes, from the start
+# of file (of decompressed data for compressed files, of input for stdin)
+MatchRecord = namedtuple('MatchRecord', 'path line offset span match')
+
+
+# raw line with its end in universal newlines mode (\n, \r\n or \r)
+RAW_LINE = re.compile(rb'[^\r\n]*(?:\r\n?|\n)|[^\r\n]+')
+
+
+def count_line_ends(chunk):
+    """Count of line ends of bytes in universal newlines mode."""
+    return chunk.count(b'\n') + chunk.count(b'\r') - chunk.count(b'\r\n')
+
+
+def buffer_records(regex, buffer, start, end, encoding, path, line=1, offset=None):
+    """Records of all matches in whole lines of buffer[start:end].
+
+    Line numbers are counted only between found matches. Plain ASCII
+    lines are searched at once by bytes pattern, other ones line by line.
+    Like in search, lines end with \n, \r\n or \r, which is seen by
+    pattern as \n, but offsets are ones of raw bytes.
+
+    Args:
+        line(int): number of the first line of buffer[start:end].
+        offset(int): offset of buffer[start] in file, start by default.
+
+    Yields:
+        MatchRecord: record of match, match is the whole match of pattern.
     """
-    text_lines = click.get_text_stream('stdin')
-    if filename:
-        text_lines = click.open_file(filename, 'r')
+    offset = start if offset is None else offset
+    chunk = buffer[start:end]
+    bregex = bytes_pattern(regex) if is_line_bound(regex) else None
+    if bregex is not None and is_plain_ascii(chunk):
+        literal = required_literal(bregex)
+        if literal is not None and literal not in chunk:
+            return
+        position = 0
+        for m in bregex.finditer(chunk):
+            match_start, match_end = m.span()
+            line += chunk.count(b'\n', position, match_start)
+            position = match_start
+            line_start = chunk.rfind(b'\n', 0, match_start) + 1
+            yield MatchRecord(path, line, offset + line_start,
+                              (offset + match_start, offset + match_end),
+                              m.group().decode('ascii'))
+        return
 
-    counter_of_matches = Counter()
-    list_of_matches = list()
-    lines_with_matches = 0
+    finditer = regex.finditer
+    for number, raw in enumerate(RAW_LINE.finditer(chunk), line):
+        raw_line = raw.group()
+        content = raw_line.rstrip(b'\r\n')
+        text = content.decode(encoding)
+        length = len(text)
+        if len(content) < len(raw_line):
+            text += '\n'
+        line_start = offset + raw.start()
+        for m in finditer(text):
+            # translated \n is the whole raw end of line
+            match_start, match_end = (
+                line_start + (len(text[:i].encode(encoding)) if i <= length else len(raw_line))
+                for i in m.span()
+            )
+            yield MatchRecord(path, number, line_start, (match_start, match_end), m.group())
 
-    # save all matches
-    for l in text_lines:
-        matches = re.findall(pattern, l)
-        list_of_matches += matches
-        lines_with_matches += (len(matches) > 0)
-    counter_of_matches.update(list_of_matches)
 
+def line_records(regex, text_lines, path, encoding=None):
+    """Records of all matches in lines of text, offsets of encoded lines."""
+    encoding = encoding or locale.getpreferredencoding(False)
+    finditer = regex.finditer
+    offset = 0
+    for number, text in enumerate(text_lines, 1):
+        for m in finditer(text):
+            match_start = offset + len(text[:m.start()].encode(encoding))
+            match_end = match_start + len(m.group().encode(encoding))
+            yield MatchRecord(path, number, offset, (match_start, match_end), m.group())
+        offset += len(text.encode(encoding))
+
+
+def blocks_records(regex, blocks, path, offset=0):
+    """Records of all matches of blocks of lines (see file_blocks).
+
+    Args:
+        offset(int): offset of the first block in file, lines are
+            numbered from 1 at it.
+    """
+    line = 1
+    for block in blocks:
+        if isinstance(block, list):
+            # text is read by lists of lines till the end of file
+            yield from line_records(regex, chain(block, chain.from_iterable(blocks)), path)
+            return
+        buffer, start, end, encoding = block
+        yield from buffer_records(regex, buffer, start, end, encoding, path, line, offset)
+        line += count_line_ends(buffer[start:end])
+        offset += end - start
+
+
+def file_records(regex, filename):
+    """Records of all matches of file, read by blocks (see file_blocks)."""
+    return blocks_records(regex, file_blocks(filename), filename)
+
+
+def range_records(regex, file_range):
+    """Records of all matches of range of file (see input_ranges).
+
+    Lines are numbered from 1 at the start of range.
+    """
+    filename, start, end = file_range
+    if end is None:
+        return file_records(regex, filename)
+    return blocks_records(regex, mapped_file_blocks(filename, start=start, end=end),
+                          filename, start)
+
+
+def range_line_count(file_range):
+    """Count of lines of mapped range of file (see input_ranges)."""
+    filename, start, end = file_range
+    return sum(count_line_ends(buffer[chunk_start:chunk_end]) for buffer, chunk_start, chunk_end, _
+               in mapped_file_blocks(filename, start=start, end=end))
+
+
+class FileLines:
+    """Lazy access to lines of regular files around given offsets.
+
+    File is mapped into memory only when its lines are requested
+    and only the last requested file is kept open, so context of matches
+    costs nothing for lines, that are not printed.
+    """
+    def __init__(self, encoding=None):
+        self._encoding = encoding or locale.getpreferredencoding(False)
+        self._path = None
+        self._file = None
+        self._buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            if self._buffer is not None:
+                self._buffer.close()
+            self._file.close()
+        self._path = self._file = self._buffer = None
+
+    def _mapped(self, path):
+        if path != self._path:
+            self.close()
+            self._path = path
+            self._file = open(path, 'rb')
+            if os.fstat(self._file.fileno()).st_size:
+                self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._buffer
+
+    def _decode(self, raw_line):
+        return raw_line.decode(self._encoding, 'replace')
+
+    def after(self, path, offset, n):
+        """Up to n lines, starting at offset of line.
+
+        Lines end with \n, \r\n or \r, like lines of records.
+
+        Returns:
+            tuple: list of lines without newlines and offset after them.
+        """
+        buffer = self._mapped(path)
+        lines = []
+        while buffer is not None and n > 0 and offset < len(buffer):
+            raw = RAW_LINE.match(buffer, offset)
+            lines.append(self._decode(raw.group().rstrip(b'\r\n')))
+            offset = raw.end()
+            n -= 1
+        return lines, offset
+
+    def before(self, path, offset, n):
+        """Up to n lines, that end right before offset of line."""
+        buffer = self._mapped(path)
+        lines = []
+        while buffer is not None and n > 0 and offset > 0:
+            # end of line is \n, \r\n or \r
+            line_end = offset - 1
+            if buffer[line_end] == ord('\n') and line_end > 0 and buffer[line_end - 1] == ord('\r'):
+                line_end -= 1
+            line_start = max(buffer.rfind(b'\n', 0, line_end), buffer.rfind(b'\r', 0, line_end)) + 1
+            lines.append(self._decode(buffer[line_start:line_end]))
+            offset = line_start
+            n -= 1
+        lines.reverse()
+        return lines
+
+
+def all_matches(found):
+    """Flattens stream of per-line matches into stream of single matches."""
+    return chain.from_iterable(found)
+
+
+def first_matches(found, n):
+    """Stream of first n matches.
+
+    Reading of found stops as soon as n matches are taken.
+    Non-positive n means all matches.
+    """
+    if n > 0:
+        return islice(all_matches(found), n)
+    return all_matches(found)
+
+
+def unique_matches(found, seen=None):
+    """Stream of matches in order of their first occurrence.
+
+    Matches from seen set are skipped, new ones are added to it.
+    """
+    seen = set() if seen is None else seen
+    for match in all_matches(found):
+        if match not in seen:
+            seen.add(match)
+            yield match
+
+
+def count_matches(found):
+    """Total count of matches."""
+    return sum(map(len, found))
+
+
+def collect_unique(found):
+    """Set of unique matches."""
+    return set(all_matches(found))
+
+
+def count_lines(found):
+    """Total count of lines with at least one match."""
+    return sum(getattr(matches, 'lines', 1) for matches in found)
+
+
+def collect_statistic(found):
+    """Count of every unique match.
+
+    Memory is bounded by the count of unique matches, not by all matches.
+    """
+    counter = Counter()
+    for matches in found:
+        counter.update(matches)
+    return counter
+
+
+# count of Space-Saving counters per requested top match
+SPACE_SAVING_FACTOR = 10
+SPACE_SAVING_MIN_CAPACITY = 1024
+
+
+class SpaceSaving:
+    """Space-Saving sketch of the most frequent matches.
+
+    Only capacity counters are kept. When a new match comes and all
+    counters are busy, the least frequent match is evicted and the new
+    one takes its count + 1. Any match, which count is greater than
+    total / capacity, is guaranteed to be kept, and counts are
+    overestimated by at most the count of the evicted match.
+
+    Interface follows Counter: update, items, most_common and total.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._counts = dict()
+        self._errors = dict()
+        # (count, match) for every kept match, counts can be stale
+        self._heap = list()
+        self._total = 0
+
+    def update(self, matches):
+        counts = self._counts
+        heap = self._heap
+        for match in matches:
+            self._total += 1
+            if match in counts:
+                counts[match] += 1
+            elif len(counts) < self.capacity:
+                counts[match] = 1
+                self._errors[match] = 0
+                heapq.heappush(heap, (1, match))
+            else:
+                # refresh stale counts until the least frequent is on top
+                while counts[heap[0][1]] != heap[0][0]:
+                    victim = heap[0][1]
+                    heapq.heapreplace(heap, (counts[victim], victim))
+                count, victim = heap[0]
+                del counts[victim]
+                del self._errors[victim]
+                counts[match] = count + 1
+                self._errors[match] = count
+                heapq.heapreplace(heap, (count + 1, match))
+
+    def merge(self, other):
+        """Merge sketch of other part of input, keeping the most frequent.
+
+        Match, which is not kept by full sketch, could have there up to
+        its least count, so the least count is added to its count and
+        error (mergeable summaries), and counts stay overestimated.
+        """
+        least = self._least_count()
+        other_least = other._least_count()
+        counts = Counter()
+        errors = Counter()
+        for match in self._counts.keys() | other._counts.keys():
+            counts[match] = self._counts.get(match, least) + other._counts.get(match, other_least)
+            errors[match] = self._errors.get(match, least) + other._errors.get(match, other_least)
+
+        self._total += other._total
+        self._counts = dict(counts.most_common(self.capacity))
+        self._errors = {match: errors[match] for match in self._counts}
+        self._heap = [(count, match) for match, count in self._counts.items()]
+        heapq.heapify(self._heap)
+
+    def _least_count(self):
+        """The least count of full sketch, 0 if not full one (it keeps all matches)."""
+        if len(self._counts) < self.capacity:
+            return 0
+        return min(self._counts.values())
+
+    def items(self):
+        return self._counts.items()
+
+    def error(self, match):
+        """Max overestimation of count of match."""
+        return self._errors.get(match, 0)
+
+    def most_common(self, n=None):
+        return Counter(self._counts).most_common(n)
+
+    def total(self):
+        return self._total
+
+
+def total_count(statistic):
+    """Total count of matches of Counter or SpaceSaving."""
+    if isinstance(statistic, SpaceSaving):
+        return statistic.total()
+    return sum(statistic.values())
+
+
+class HyperLogLog:
+    """HyperLogLog sketch of count of unique matches.
+
+    Each match is hashed to 64 bits: the first precision bits select
+    one of 2^precision registers, and the register keeps the max position
+    of the first set bit in the rest of hash. Memory is 2^precision bytes
+    for any count of matches, relative error is about 1.04 / sqrt(2^precision).
+
+    Hash doesn't depend on process, so sketches of parts of input
+    can be merged.
+    """
+    def __init__(self, precision=12):
+        if not 4 <= precision <= 18:
+            raise ValueError('Precision of HyperLogLog must be in range 4..18')
+        self.precision = precision
+        self._registers = bytearray(1 << precision)
+
+    def update(self, matches):
+        from hashlib import blake2b
+
+        from_bytes = int.from_bytes
+        registers = self._registers
+        rest_bits = 64 - self.precision
+        rest_mask = (1 << rest_bits) - 1
+        for match in matches:
+            if not isinstance(match, str):
+                match = repr(match)
+            x = from_bytes(blake2b(match.encode('utf-8', 'surrogatepass'), digest_size=8).digest(), 'big')
+            index = x >> rest_bits
+            rank = rest_bits - (x & rest_mask).bit_length() + 1
+            if rank > registers[index]:
+                registers[index] = rank
+
+    def merge(self, other):
+        """Merge sketch of other part of input."""
+        if other.precision != self.precision:
+            raise ValueError('Only HyperLogLog sketches of same precision can be merged')
+        self._registers = bytearray(map(max, self._registers, other._registers))
+
+    def count(self):
+        """Estimated count of unique matches."""
+        m = len(self._registers)
+        if m == 16:
+            alpha = 0.673
+        elif m == 32:
+            alpha = 0.697
+        elif m == 64:
+            alpha = 0.709
+        else:
+            alpha = 0.7213 / (1 + 1.079 / m)
+
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self._registers)
+        zeros = self._registers.count(0)
+        # small cardinalities are estimated better by count of empty registers
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def __len__(self):
+        return self.count()
+
+
+def fill_sketch(found, sketch):
+    """Update sketch (SpaceSaving, HyperLogLog) by all matches."""
+    for matches in found:
+        sketch.update(matches)
+    return sketch
+
+
+def summarize(found, kind, sketch=None):
+    """Reduce stream of matches to summary of given kind.
+
+    Summaries of parts of input can be merged by merge_summaries.
+
+    Args:
+        found(Iterable[list]): stream of per-line matches.
+        kind(str): one of
+            'lines' - count of lines with matches,
+            'count' - count of matches,
+            'unique' - set of unique matches,
+            'statistic' - Counter of matches,
+            'sketch' - given sketch, updated by all matches,
+            'matches' - list of all matches.
+        sketch: empty SpaceSaving or HyperLogLog for 'sketch' kind.
+    """
+    with profile_stage('count'):
+        return _summarize(found, kind, sketch)
+
+
+def _summarize(found, kind, sketch=None):
+    if kind == 'lines':
+        return count_lines(found)
+    elif kind == 'count':
+        return count_matches(found)
+    elif kind == 'unique':
+        return collect_unique(found)
+    elif kind == 'statistic':
+        return collect_statistic(found)
+    elif kind == 'sketch':
+        return fill_sketch(found, sketch)
+    elif kind == 'matches':
+        return list(all_matches(found))
+    else:
+        raise ValueError(f'Unknown kind of summary: {kind}')
+
+
+def merge_summaries(kind, summaries, sketch=None):
+    """Merge summaries of parts of input in their order.
+
+    Counter keeps order of first occurrence of matches, as if the input
+    were searched at once. Sketches are merged into given empty sketch.
+    """
+    if kind in ('lines', 'count'):
+        return sum(summaries)
+    elif kind == 'matches':
+        return list(chain.from_iterable(summaries))
+    elif kind == 'sketch':
+        for summary in summaries:
+            sketch.merge(summary)
+        return sketch
+
+    merged = set() if kind == 'unique' else Counter()
+    for summary in summaries:
+        merged.update(summary)
+    return merged
+
+
+def empty_summary(kind, sketch=None):
+    """Summary of given kind for empty input, copy of sketch for 'sketch' kind."""
+    if kind in ('lines', 'count'):
+        return 0
+    elif kind == 'unique':
+        return set()
+    elif kind == 'statistic':
+        return Counter()
+    elif kind == 'sketch':
+        return copy.deepcopy(sketch)
+    elif kind == 'matches':
+        return []
+    else:
+        raise ValueError(f'Unknown kind of summary: {kind}')
+
+
+def add_to_summary(kind, summary, found):
+    """Update summary of given kind by stream of per-line matches.
+
+    Returns:
+        updated summary (counts are immutable, so use the returned one).
+    """
+    if kind in ('lines', 'count'):
+        return summary + summarize(found, kind)
+    elif kind == 'matches':
+        summary.extend(all_matches(found))
+        return summary
+    # set, Counter and sketches are updated in place
+    return fill_sketch(found, summary)
+
+
+# size of part of file searched by one worker process
+PARALLEL_RANGE_SIZE = 1 << 26
+
+
+def input_ranges(paths, range_size=None):
+    """Split files of paths into ranges of whole lines.
+
+    Yields:
+        tuple: filename, start and end offsets of range.
+        Files, that can't be mapped into memory, are not split
+        and their range is (filename, 0, None).
+    """
+    range_size = range_size or PARALLEL_RANGE_SIZE
+    for filename in input_files(paths):
+        if not can_map_file(filename):
+            yield filename, 0, None
+            continue
+
+        with open(filename, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                continue
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                for start, end in line_ranges(buffer, 0, size, range_size):
+                    yield filename, start, end
+
+
+def range_blocks(file_range):
+    """Blocks of lines of range of file (see input_ranges and file_blocks)."""
+    filename, start, end = file_range
+    if end is None:
+        return read_blocks(file_blocks(filename))
+    return read_blocks(mapped_file_blocks(filename, start=start, end=end))
+
+
+def search_range(regex, file_range):
+    """Search lines of range of file (see input_ranges).
+
+    Yields:
+        list: all matches of the line or ChunkMatches of several lines
+    """
+    for block in range_blocks(file_range):
+        yield from search_block(regex, block)
+
+
+def search_ranges(regex, file_ranges):
+    """Search all ranges of files one by one.
+
+    Yields:
+        list: all matches of the line or ChunkMatches of several lines
+    """
+    for file_range in file_ranges:
+        yield from search_range(regex, file_range)
+
+
+def summarize_range(regex, kind, file_range, sketch=None):
+    """Summary of one range of file, runs in worker process."""
+    if kind in COUNT_KINDS:
+        return count_blocks(regex, kind, range_blocks(file_range))
+    return summarize(search_range(regex, file_range), kind, sketch)
+
+
+class RangeMatches(list):
+    """All matches of range of file, found by worker process.
+
+    Like for ChunkMatches, count of lines with matches is found only
+    on demand (for -l): the range is counted again.
+    """
+    def __init__(self, matches, regex, file_range):
+        super().__init__(matches)
+        self._regex = regex
+        self._file_range = file_range
+
+    @property
+    def lines(self):
+        if not self:
+            return 0
+        return count_blocks(self._regex, 'lines', range_blocks(self._file_range))
+
+
+def range_matches(regex, file_range):
+    """Matches of range of file as RangeMatches, runs in worker process."""
+    return RangeMatches(summarize_range(regex, 'matches', file_range), regex, file_range)
+
+
+def parallel_map(worker, file_ranges, jobs=None):
+    """Results of worker for all ranges of files, found by pool of processes.
+
+    Results are yielded in order of ranges. Only a few ranges per worker
+    are processed ahead, so large results (e.g. 'matches') don't pile up
+    in memory, and stopping the iteration cancels the rest of work.
+
+    Args:
+        worker(callable): picklable function of one range of file.
+        file_ranges(Iterable[tuple]): ranges of files, see input_ranges.
+        jobs(int): count of worker processes, count of CPUs by default.
+    """
+    if PROFILE is not None:
+        # work of processes is seen only as waiting for their results
+        return PROFILE.iterate('workers', _parallel_map(worker, file_ranges, jobs))
+    return _parallel_map(worker, file_ranges, jobs)
+
+
+def _disable_profile():
+    global PROFILE
+    PROFILE = None
+
+
+def _parallel_map(worker, file_ranges, jobs=None):
+    from concurrent.futures import ProcessPoolExecutor
+
+    jobs = jobs or os.cpu_count()
+    executor = ProcessPoolExecutor(max_workers=jobs, initializer=_disable_profile)
+    ahead = 2 * jobs
+    pending = deque()
+    try:
+        for file_range in file_ranges:
+            pending.append(executor.submit(worker, file_range))
+            if len(pending) >= ahead:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def parallel_summaries(regex, file_ranges, kind, jobs=None, sketch=None):
+    """Summaries of all ranges of files, found by pool of processes.
+
+    Args:
+        regex(re.Pattern): compiled text pattern.
+        file_ranges(Iterable[tuple]): ranges of files, see input_ranges.
+        kind(str): kind of summary, see summarize.
+        jobs(int): count of worker processes, count of CPUs by default.
+        sketch: empty sketch for 'sketch' kind.
+    """
+    worker = partial(summarize_range, regex, kind, sketch=sketch)
+    return parallel_map(worker, file_ranges, jobs)
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def any_pattern(regexes):
+    """Alternation of patterns, that matches lines with a match of any of them.
+
+    Returns:
+        re.Pattern or None: None if patterns can't be joined safely
+        (groups and backreferences, global inline flags).
+    """
+    if any(regex.groups or regex.flags != re.UNICODE for regex in regexes):
+        return None
+    try:
+        return re.compile('|'.join(f'(?:{regex.pattern})' for regex in regexes))
+    except re.error:
+        return None
+
+
+def multi_summarize(regexes, blocks, kind, sketch=None):
+    """Summaries of several patterns, found in one pass over blocks of input.
+
+    Every block (see file_blocks) is read once and searched for all
+    patterns while it is in memory. Lines of text blocks are prefiltered
+    by alternation of all patterns, so lines without matches of any
+    pattern are skipped by all of them.
+
+    Args:
+        regexes(tuple): compiled text patterns.
+        blocks(Iterable): blocks of lines, see file_blocks.
+        kind(str): kind of summary, see summarize.
+        sketch: empty sketch for 'sketch' kind, copied for every pattern.
+
+    Returns:
+        list: summaries of patterns in their order.
+    """
+    summaries = [empty_summary(kind, sketch) for _ in regexes]
+    prefilter = any_pattern(regexes)
+    for block in blocks:
+        if isinstance(block, list) and prefilter is not None:
+            search = prefilter.search
+            block = [line for line in block if search(line)]
+            if not block:
+                continue
+        for i, regex in enumerate(regexes):
+            summaries[i] = add_to_summary(kind, summaries[i], search_block(regex, block))
+    return summaries
+
+
+def multi_summarize_range(regexes, kind, file_range, sketch=None):
+    """Summaries of several patterns of one range of file, runs in worker process."""
+    return multi_summarize(regexes, range_blocks(file_range), kind, sketch)
+
+
+def parallel_multi_summaries(regexes, file_ranges, kind, jobs=None, sketch=None):
+    """Summaries of several patterns of all files, found by pool of processes.
+
+    Returns:
+        list: merged summaries of patterns in their order.
+    """
+    worker = partial(multi_summarize_range, regexes, kind, sketch=sketch)
+    parts = parallel_map(worker, file_ranges, jobs)
+    summaries = [empty_summary(kind, sketch) for _ in regexes]
+    for part in parts:
+        summaries = [
+            merge_summaries(kind, pair, empty_summary(kind, sketch))
+            for pair in zip(summaries, part)
+        ]
+    return summaries
+
+
+class Searcher:
+    """Search engine for use in-process, without command line and printing.
+
+    Pattern is compiled once, every method searches given input again
+    and returns Python objects. Input is either paths of files and
+    directories (or all indexed files with index_file) or lines of text.
+
+    Example:
+        engine = Searcher('ERROR [0-9]+', jobs=0)
+        engine.count(['logs/'])
+        engine.statistic(['logs/']).most_common(10)
+
+    Args:
+        pattern(str): regular expression.
+        jobs(int): count of worker processes for files, 0 - count of CPUs.
+        index_file(str): trigram index of files, see the_searcher_index.py.
+        top(int): keep only top most frequent matches in statistic_items.
+        approx(bool): use sketches of bounded memory for unique matches
+            and (with top) for statistic, results are approximate.
+        precision(int): precision of HyperLogLog for approximate count_unique.
+    """
+    def __init__(self, pattern, jobs=1, index_file=None, top=None, approx=False, precision=12):
+        self.regex = compile_pattern(pattern)
+        self.jobs = jobs
+        self.index_file = index_file
+        self.top = top
+        self.approx = approx
+        self.precision = precision
+
+    def file_ranges(self, paths):
+        """Ranges of files to search, only candidate ones with index."""
+        if self.index_file:
+            from the_searcher_index import TrigramIndex
+
+            with TrigramIndex(self.index_file) as index:
+                yield from index.candidate_ranges(self.regex, paths or index.indexed_files())
+        else:
+            yield from input_ranges(paths)
+
+    def _paths(self, paths):
+        """Paths to search entirely, all indexed files if there are no paths."""
+        if self.index_file and not paths:
+            from the_searcher_index import TrigramIndex
+
+            with TrigramIndex(self.index_file) as index:
+                return index.indexed_files()
+        return paths
+
+    def _check_input(self, paths, lines):
+        if lines is None and not (paths or self.index_file):
+            raise ValueError('Nothing to search: neither paths nor lines are given')
+
+    def found(self, paths=None, lines=None):
+        """Stream of per-line matches (lists) of input.
+
+        Matches of several lines can be joined into one list with count
+        of their lines with matches in its lines attribute (ChunkMatches,
+        RangeMatches of ranges searched in parallel), see count_lines.
+        """
+        self._check_input(paths, lines)
+        if lines is not None:
+            if PROFILE is not None:
+                # lines are timed by blocks, the same way as files
+                blocks = read_blocks(text_blocks(lines))
+                return chain.from_iterable(search_block(self.regex, block) for block in blocks)
+            return search_lines(self.regex, lines)
+        elif self.jobs != 1:
+            return parallel_map(partial(range_matches, self.regex), self.file_ranges(paths), self.jobs)
+        elif self.index_file:
+            return search_ranges(self.regex, self.file_ranges(paths))
+        return search_files(self.regex, paths)
+
+    def summary(self, kind, paths=None, lines=None, sketch=None):
+        """Summary of input of given kind, see summarize."""
+        self._check_input(paths, lines)
+        if lines is None and self.jobs != 1:
+            return merge_summaries(
+                kind,
+                parallel_summaries(self.regex, self.file_ranges(paths), kind, self.jobs, sketch),
+                sketch,
+            )
+        if kind in COUNT_KINDS:
+            # counts don't need strings of matches
+            return count_blocks(self.regex, kind, self.blocks(paths, lines))
+        return summarize(self.found(paths, lines), kind, sketch)
+
+    def blocks(self, paths=None, lines=None):
+        """Stream of blocks of lines of input, see file_blocks."""
+        self._check_input(paths, lines)
+        if lines is not None:
+            return read_blocks(text_blocks(lines))
+        return chain.from_iterable(map(range_blocks, self.file_ranges(paths)))
+
+    def records(self, paths=None, lines=None):
+        """Stream of MatchRecord of all matches of input.
+
+        Files are searched one by one and entirely (even with index
+        and jobs), as line numbers depend on all previous lines.
+        """
+        self._check_input(paths, lines)
+        if lines is not None:
+            return line_records(self.regex, lines, STDIN_PATH)
+        return chain.from_iterable(
+            file_records(self.regex, filename) for filename in input_files(self._paths(paths))
+        )
+
+    def matches(self, paths=None, lines=None):
+        """Stream of all matches."""
+        return all_matches(self.found(paths, lines))
+
+    def first_matches(self, n, paths=None, lines=None):
+        """Stream of first n matches, all matches for non-positive n."""
+        return first_matches(self.found(paths, lines), n)
+
+    def unique_matches(self, paths=None, lines=None):
+        """Stream of unique matches in order of their first occurrence."""
+        return unique_matches(self.found(paths, lines))
+
+    def count(self, paths=None, lines=None):
+        """Total count of matches."""
+        return self.summary('count', paths, lines)
+
+    def count_lines(self, paths=None, lines=None):
+        """Total count of lines with at least one match."""
+        return self.summary('lines', paths, lines)
+
+    def unique(self, paths=None, lines=None):
+        """Set of unique matches, HyperLogLog with approx."""
+        if self.approx:
+            return self.summary('sketch', paths, lines, HyperLogLog(self.precision))
+        return self.summary('unique', paths, lines)
+
+    def count_unique(self, paths=None, lines=None):
+        """Total count of unique matches, estimated with approx."""
+        return len(self.unique(paths, lines))
+
+    def statistic(self, paths=None, lines=None):
+        """Counter of matches, SpaceSaving sketch with top and approx."""
+        if self.top and self.approx:
+            capacity = max(self.top * SPACE_SAVING_FACTOR, SPACE_SAVING_MIN_CAPACITY)
+            return self.summary('sketch', paths, lines, SpaceSaving(capacity))
+        return self.summary('statistic', paths, lines)
+
+    def statistic_items(self, counter):
+        """Items (match, count) of statistic, only top most frequent with top."""
+        if self.top:
+            return counter.most_common(self.top)
+        return counter.items()
+
+
+class MultiSearcher(Searcher):
+    """Search engine for several patterns, searched in one pass over input.
+
+    Summaries (count, count_lines, unique, count_unique, statistic) are
+    lists of results of patterns in their order. Streams of matches
+    are available only for one pattern (see Searcher).
+    """
+    def __init__(self, patterns, jobs=1, index_file=None, top=None, approx=False, precision=12):
+        super().__init__(patterns[0], jobs, index_file, top, approx, precision)
+        self.patterns = list(patterns)
+        self.regexes = tuple(map(compile_pattern, patterns))
+
+    def file_ranges(self, paths):
+        """Whole files to search, all indexed files if there are no paths."""
+        return input_ranges(self._paths(paths))
+
+    def found(self, paths=None, lines=None):
+        raise ValueError('Matches of several patterns can only be summarized')
+
+    def records(self, paths=None, lines=None):
+        raise ValueError('Matches of several patterns can only be summarized')
+
+    def summary(self, kind, paths=None, lines=None, sketch=None):
+        """Summaries of input of given kind for all patterns, see summarize."""
+        self._check_input(paths, lines)
+        if lines is None and self.jobs != 1:
+            return parallel_multi_summaries(
+                self.regexes, self.file_ranges(paths), kind, self.jobs, sketch)
+        return multi_summarize(self.regexes, self.blocks(paths, lines), kind, sketch)
+
+    def count_unique(self, paths=None, lines=None):
+        return list(map(len, self.unique(paths, lines)))
+
+
+# size of block of appended data read at once in --follow mode
+FOLLOW_BLOCK_SIZE = 1 << 24
+
+
+def follow_file(regex, filename, interval=1.0):
+    """Search lines appended to growing file.
+
+    File is checked every interval seconds, only bytes appended since
+    the previous check are read. If file is truncated or replaced by
+    another one (log rotation), the rest of old file is searched and
+    the new one is read from the start. Incomplete last line waits
+    for its end.
+
+    Yields:
+        generator: stream of per-line matches of lines appended since the
+        previous check, must be consumed before the next one.
+    """
+    encoding = locale.getpreferredencoding(False)
+    f = None
+    offset = 0
+    rest = b''
+
+    def appended():
+        nonlocal offset, rest
+        f.seek(offset)
+        for block in iter(partial(f.read, FOLLOW_BLOCK_SIZE), b''):
+            offset += len(block)
+            block = rest + block
+            lines_end = block.rfind(b'\n') + 1
+            rest = block[lines_end:]
+            if lines_end:
+                yield from search_buffer(regex, block, 0, lines_end, encoding)
+
+    def poll():
+        nonlocal f, offset, rest
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            # file is rotated, but the new one is not created yet
+            stat = None
+
+        if f is not None and stat is not None:
+            rotated = stat.st_ino != os.fstat(f.fileno()).st_ino
+            if rotated:
+                # lines appended to old file before rotation
+                yield from appended()
+            if rotated or stat.st_size < offset:
+                f.close()
+                f = None
+
+        if f is None and stat is not None:
+            f = open(filename, 'rb')
+            offset = 0
+            rest = b''
+
+        if f is not None:
+            yield from appended()
+
+    try:
+        while True:
+            yield poll()
+            time.sleep(interval)
+    finally:
+        if f is not None:
+            f.close()
+
+
+def context_output(records, before, after, file_lines):
+    """Lines of output with context of matched lines, like grep -A -B.
+
+    Matched lines are printed once as 'path:line:text', context lines
+    as 'path-line-text' and not contiguous groups are separated by '--'.
+    Context is read from file only for printed lines.
+    """
+    path = None
+    printed = 0  # number of the last printed line of file
+    next_offset = 0  # offset of the line after it
+    left = 0  # count of context lines after it, that are not printed yet
+
+    def tail(n):
+        nonlocal printed, next_offset, left
+        lines, next_offset = file_lines.after(path, next_offset, n)
+        for number, text in enumerate(lines, printed + 1):
+            yield f'{path}-{number}-{text}'
+        printed += len(lines)
+        left = 0
+
+    for (record_path, line, offset), _ in groupby(records, key=itemgetter(0, 1, 2)):
+        # the next file starts (the same file can be given twice)
+        if record_path != path or line <= printed:
+            if path is not None:
+                yield from tail(left)
+                yield '--'
+            path, printed, left = record_path, 0, 0
+        else:
+            yield from tail(min(left, line - printed - 1))
+            if line - before > printed + 1:
+                yield '--'
+
+        first = max(line - before, printed + 1)
+        for number, text in enumerate(file_lines.before(path, offset, line - first), first):
+            yield f'{path}-{number}-{text}'
+        (text,), next_offset = file_lines.after(path, offset, 1)
+        yield f'{path}:{line}:{text}'
+        printed, left = line, after
+
+    if path is not None:
+        yield from tail(left)
+
+
+def output_records(records, before=0, after=0):
+    """Print records of matches as 'path:line:offset:match' or with context."""
+    if not (before or after):
+        echo_lines(f'{r.path}:{r.line}:{r.span[0]}:{r.match}' for r in records)
+        return
+    with FileLines() as file_lines:
+        echo_lines(context_output(records, before, after, file_lines))
+
+
+def output_matches(engine, source, flag_u, flag_c, flag_l, flag_s, flag_o, flag_n, stat,
+                   sort_memory=None):
+    """Print results of one pattern for given flags of searcher.
+
+    Matches are never stored: each flag consumes stream of per-line
+    matches or merges summaries of parts of files, found by worker processes.
+
+    Args:
+        engine(Searcher): engine of pattern.
+        source(dict): input of engine methods, paths or lines.
+        sort_memory(int): memory limit (bytes) of sorting, see sorted_items.
+    """
     # flag -l : total count of LINES with at least one match
     if flag_l:
-        click.echo(lines_with_matches)
+        echo_lines([engine.count_lines(**source)])
 
     # flag --stats: statistics of matches
     elif stat:
-        #
+        counter_of_matches = engine.statistic(**source)
         output_stat_with_sorting_options(
-            counter_of_matches.items(),
-            len(list_of_matches),
+            engine.statistic_items(counter_of_matches),
+            total_count(counter_of_matches),
             stat=stat,
             flag_s=flag_s,
             flag_o=flag_o,
+            memory_limit=sort_memory,
         )
 
     # other flags
     else:
         # flags -u and -c: print total count of unique matches
         if flag_u and flag_c:
-            click.echo(len(counter_of_matches.keys()))
+            echo_lines([engine.count_unique(**source)])
 
         # flag -c: print total count of found matches
         elif flag_c:
-            click.echo(len(list_of_matches))
+            echo_lines([engine.count(**source)])
 
         # flag -u: print unique matches only
         elif flag_u:
-            out_data = counter_of_matches
-
             if flag_s or flag_o:
                 output_data_with_sorting_options(
-                    out_data.items(),
+                    engine.statistic_items(engine.statistic(**source)),
                     flag_s,
                     flag_o,
+                    sort_memory,
                 )
             else:
-                output_data(out_data)
+                output_data(engine.unique_matches(**source))
 
         # flag -n: print first N matches
         elif flag_n:
-            if 0 < flag_n < len(list_of_matches):
-                out_data = list_of_matches[:flag_n]
-            else:
-                out_data = list_of_matches
+            out_data = engine.first_matches(flag_n, **source)
 
             if flag_s or flag_o:
                 output_data_with_sorting_options(
-                    Counter(out_data).items(),
+                    engine.statistic_items(Counter(out_data)),
                     flag_s,
                     flag_o,
+                    sort_memory,
                 )
             else:
                 output_data(out_data)
@@ -159,15 +2089,87 @@ def searcher(pattern, filename, flag_u, flag_c, flag_l, flag_s, flag_o, flag_n,
 
             if flag_s or flag_o:
                 output_data_with_sorting_options(
-                    counter_of_matches.items(),
+                    engine.statistic_items(engine.statistic(**source)),
                     flag_s,
                     flag_o,
+                    sort_memory,
                 )
             else:
-                output_data(list_of_matches)
+                output_data(engine.matches(**source))
 
 
-if __name__ == '__main__':
-    searcher()
+def fast_options(args):
+    """Options of searcher for simple command line, None for other ones.
 
+    Only flags -u, -c, -l, -n N, PATTERN and existing PATHS are handled,
+    any other option, missing or wrong argument needs click.
 
+    Returns:
+        dict or None: pattern, paths and flags.
+    """
+    options = dict(pattern=None, paths=[], flag_u=False, flag_c=False, flag_l=False, flag_n=None)
+    args = iter(args)
+    for arg in args:
+        if arg in ('-u', '-c', '-l'):
+            options['flag_' + arg[1]] = True
+        elif arg == '-n':
+            try:
+                options['flag_n'] = int(next(args))
+            except (StopIteration, ValueError):
+                return None
+        elif arg.startswith('-'):
+            return None
+        elif options['pattern'] is None:
+            options['pattern'] = arg
+        elif os.path.exists(arg):
+            options['paths'].append(arg)
+        else:
+            return None
+    if options['pattern'] is None:
+        return None
+    return options
+
+
+def main(args=None):
+    """Entry point of searcher.
+
+    Simple command lines (see fast_options) are handled without click,
+    the others are passed to the_searcher_cli.searcher.
+    """
+    args = sys.argv[1:] if args is None else args
+    options = fast_options(args)
+    if options is None:
+        from the_searcher_cli import searcher
+
+        searcher(args)
+        return
+
+    engine = Searcher(options.pop('pattern'))
+    paths = options.pop('paths')
+    if paths:
+        source = dict(paths=paths)
+    else:
+        # universal newlines, like click stream of stdin in the_searcher_cli
+        source = dict(lines=io.TextIOWrapper(sys.stdin.buffer, encoding=sys.stdin.encoding,
+                                             errors=sys.stdin.errors, newline=None))
+    try:
+        output_matches(engine, source, flag_s=None, flag_o=None, stat=None, **options)
+    except BrokenPipeError:
+        # output is piped to closed reader (e.g. head), like in click
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+
+
+def __getattr__(name):
+    # click command is imported only when it is used
+    if name == 'searcher':
+        from the_searcher_cli import searcher
+
+        return searcher
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+if __name__ == '__main__':
+    # one module for both script and imports of the_searcher_cli
+    sys.modules.setdefault('the_searcher', sys.modules[__name__])
+    main()
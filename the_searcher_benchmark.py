@@ -0,0 +1,306 @@
+"""Benchmark of the_searcher on synthetic logs.
+
+Logs of given sizes, density of rare matches and cardinality of values
+are generated once into work directory. Every flag combination from
+`commands` file runs for every log and pattern type in a new process
+(python3 -m the_searcher), so startup is included in latency.
+Report is JSON with throughput (MB/s), peak RSS and latency of runs.
+Peak RSS is the larger one of searcher process and of its largest
+worker process (-j), both are measured by searcher (see RSS_WRAPPER).
+
+Usage:
+    python3 the_searcher_benchmark.py run --sizes 1M,64M,2G --output new.json
+    python3 the_searcher_benchmark.py compare old.json new.json
+"""
+import json
+import os
+import platform
+import random
+import re
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import click
+
+from the_searcher_cli import searcher
+
+
+# directory of searcher, where it runs from
+SEARCHER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_COMMANDS = os.path.join(SEARCHER_DIR, 'commands')
+
+# names of searcher in command lines of commands file
+SEARCHER_SCRIPTS = ('the_searcher.py', 'the_searcher')
+
+# patterns of different kinds, the same for all logs
+PATTERN_TYPES = {
+    # rare literal, count of matches depends on density
+    'literal': 'ERROR',
+    # class with quantifier, count of unique matches depends on cardinality
+    'class': r'user\d+',
+    # pattern of commands file, matches in every line
+    'words': r'\w+\s\w',
+}
+
+LEVELS = ['INFO', 'DEBUG', 'WARNING']
+WORDS = ['request', 'response', 'session', 'cache', 'query', 'token', 'payload', 'worker']
+
+SIZE_UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+
+# size of generated text written at once
+GENERATE_BLOCK_SIZE = 1 << 20
+
+# runs program of the second argument (module or script, e.g. the_searcher)
+# and writes at exit into file of the first argument peak RSS (KB) of
+# program or of its largest child (worker) process, the larger of them. ru_maxrss of wait4 can't be used:
+# Linux keeps it across exec, so it is at least peak RSS of parent.
+RSS_WRAPPER = '''
+import atexit, resource, runpy, sys
+
+def write_peak_rss(filename):
+    try:
+        with open('/proc/self/status') as f:
+            peak = next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+    except (OSError, StopIteration):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # workers are joined by searcher before exit
+    peak = max(peak, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    with open(filename, 'w') as f:
+        f.write(str(peak))
+
+atexit.register(write_peak_rss, sys.argv[1])
+program = sys.argv[2]
+sys.argv = [program, *sys.argv[3:]]
+if program.endswith('.py'):
+    runpy.run_path(program, run_name='__main__')
+else:
+    runpy.run_module(program, run_name='__main__', alter_sys=True)
+'''
+
+
+def parse_size(size):
+    """Size in bytes of string like 512K, 64M or 2G."""
+    match = re.fullmatch(r'(\d+)([KMG]?)', size.strip().upper())
+    if match is None:
+        raise ValueError(f'Wrong size: {size}')
+    return int(match.group(1)) * SIZE_UNITS[match.group(2)]
+
+
+def generate_log(filename, size, density, cardinality, seed=0):
+    """Write synthetic log of about size bytes (whole lines).
+
+    Args:
+        density(float): part of lines with ERROR level.
+        cardinality(int): count of different users (user<N>).
+    """
+    rand = random.Random(seed)
+    written = 0
+    second = 0
+    with open(filename, 'w') as f:
+        while written < size:
+            lines = []
+            block_size = 0
+            while block_size < GENERATE_BLOCK_SIZE and written + block_size < size:
+                second += 1
+                level = 'ERROR' if rand.random() < density else rand.choice(LEVELS)
+                line = '{:08d} {} user{} {} {} id={}\n'.format(
+                    second, level, rand.randrange(cardinality),
+                    rand.choice(WORDS), rand.choice(WORDS), rand.randrange(1 << 20),
+                )
+                lines.append(line)
+                block_size += len(line)
+            f.write(''.join(lines))
+            written += block_size
+
+
+def log_file(workdir, size, density, cardinality):
+    """Path of generated log with given parameters, generated if not exists."""
+    filename = os.path.join(workdir, f'log-{size}-{density}-{cardinality}.txt')
+    if not os.path.exists(filename):
+        generate_log(filename + '.tmp', size, density, cardinality)
+        os.replace(filename + '.tmp', filename)
+    return filename
+
+
+def command_flags(commands_file):
+    """Flags of searcher of every line of commands file.
+
+    Patterns and paths of commands are dropped, --help is skipped.
+
+    Returns:
+        list: lists of arguments without PATTERN and PATHS.
+    """
+    value_options = {
+        name
+        for param in searcher.params
+        if isinstance(param, click.Option) and not param.is_flag
+        for name in param.opts
+    }
+    all_flags = []
+    with open(commands_file) as f:
+        for line in f:
+            args = shlex.split(line)
+            # arguments after python3 the_searcher.py or python3 -m the_searcher
+            scripts = [i for i, arg in enumerate(args) if arg in SEARCHER_SCRIPTS]
+            if not scripts:
+                continue
+            args = args[scripts[0] + 1:]
+
+            flags = []
+            args = iter(args)
+            for arg in args:
+                if not arg.startswith('-'):
+                    break
+                flags.append(arg)
+                if arg in value_options:
+                    flags.append(next(args))
+            if '--help' not in flags and flags not in all_flags:
+                all_flags.append(flags)
+    return all_flags
+
+
+def run_once(args, program='the_searcher'):
+    """Run searcher (or other program, see RSS_WRAPPER) in a new process.
+
+    Returns:
+        tuple: wall time in seconds, peak RSS in KB (of searcher or of its
+        largest worker) and return code.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        rss_file = os.path.join(tmp_dir, 'rss')
+        start = time.perf_counter()
+        with open(os.devnull, 'wb') as devnull:
+            returncode = subprocess.call([sys.executable, '-c', RSS_WRAPPER, rss_file, program, *args],
+                                         stdout=devnull, stderr=devnull, cwd=SEARCHER_DIR)
+        seconds = time.perf_counter() - start
+        with open(rss_file) as f:
+            peak_rss = int(f.read())
+    return seconds, peak_rss, returncode
+
+
+def benchmark(args, size, repeat):
+    """Median latency, throughput and max peak RSS of repeated runs."""
+    runs = [run_once(args) for _ in range(repeat)]
+    seconds = statistics.median(run[0] for run in runs)
+    return {
+        'seconds': round(seconds, 4),
+        'mb_per_s': round(size / (1 << 20) / seconds, 2),
+        'peak_rss_kb': max(run[1] for run in runs),
+        'returncode': max(run[2] for run in runs),
+    }
+
+
+def git_version():
+    """Commit of searcher sources, None if it is unknown."""
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'],
+            cwd=SEARCHER_DIR,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True,
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+@click.group()
+def cli():
+    """Benchmark of the_searcher on synthetic logs."""
+
+
+@cli.command()
+@click.option('--sizes', default='1M,16M', help='Sizes of logs, e.g. 1M,64M,2G.')
+@click.option('--densities', default='0.01,0.5', help='Parts of lines with ERROR.')
+@click.option('--cardinalities', default='100,100000', help='Counts of different users.')
+@click.option('--patterns', 'pattern_types', default=','.join(PATTERN_TYPES),
+              help='Pattern types: ' + ', '.join(f'{k} ({v})' for k, v in PATTERN_TYPES.items()))
+@click.option('--commands', 'commands_file', default=DEFAULT_COMMANDS, type=click.Path(exists=True),
+              help='File of searcher command lines, their flags are benchmarked.')
+@click.option('--repeat', default=3, type=click.IntRange(min=1), help='Runs of every command.')
+@click.option('--workdir', default='benchmark_logs', type=click.Path(file_okay=False),
+              help='Directory of generated logs, they are reused by next runs.')
+@click.option('--output', default='benchmark.json', type=click.Path(dir_okay=False),
+              help='File of JSON report.')
+def run(sizes, densities, cardinalities, pattern_types, commands_file, repeat, workdir, output):
+    """Run all flags of commands for all logs and patterns, write JSON report."""
+    sizes = [parse_size(size) for size in sizes.split(',')]
+    densities = [float(density) for density in densities.split(',')]
+    cardinalities = [int(cardinality) for cardinality in cardinalities.split(',')]
+    pattern_types = pattern_types.split(',')
+    unknown = set(pattern_types) - set(PATTERN_TYPES)
+    if unknown:
+        raise click.BadParameter(', '.join(sorted(unknown)), param_hint='--patterns')
+    all_flags = command_flags(commands_file)
+    workdir = os.path.abspath(workdir)
+    os.makedirs(workdir, exist_ok=True)
+
+    # latency of start of searcher without work
+    empty_log = os.path.join(workdir, 'empty.txt')
+    open(empty_log, 'w').close()
+    startup = benchmark(['-c', 'ERROR', empty_log], 0, repeat)
+    del startup['mb_per_s']
+
+    results = []
+    for size in sizes:
+        for density in densities:
+            for cardinality in cardinalities:
+                log = log_file(workdir, size, density, cardinality)
+                size_on_disk = os.path.getsize(log)
+                for pattern_type in pattern_types:
+                    for flags in all_flags:
+                        # with -e and -f patterns are given by options
+                        pattern = [] if {'-e', '-f'} & set(flags) else [PATTERN_TYPES[pattern_type]]
+                        result = dict(
+                            size=size_on_disk,
+                            density=density,
+                            cardinality=cardinality,
+                            pattern_type=pattern_type,
+                            flags=' '.join(map(shlex.quote, flags)),
+                        )
+                        result.update(benchmark([*flags, *pattern, log], size_on_disk, repeat))
+                        results.append(result)
+                        click.echo('{size:>12} {density:>5} {cardinality:>7} {pattern_type:>8} '
+                                   '{flags:<30} {seconds:>8}s {mb_per_s:>9} MB/s '
+                                   '{peak_rss_kb:>8} KB'.format(**result))
+
+    report = {
+        'version': git_version(),
+        'python': sys.version,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'repeat': repeat,
+        'startup': startup,
+        'results': results,
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+@cli.command()
+@click.argument('old', type=click.File('r'))
+@click.argument('new', type=click.File('r'))
+def compare(old, new):
+    """Print ratios of latency and peak RSS (new / old) of the same runs."""
+    old, new = json.load(old), json.load(new)
+    key = ('size', 'density', 'cardinality', 'pattern_type', 'flags')
+    old_results = {tuple(result[k] for k in key): result for result in old['results']}
+    click.echo(f"{old['version']} -> {new['version']}")
+    startup_ratio = new['startup']['seconds'] / old['startup']['seconds']
+    click.echo(f'startup: {startup_ratio:.2f}x time')
+    for result in new['results']:
+        before = old_results.get(tuple(result[k] for k in key))
+        if before is None:
+            continue
+        click.echo('{size:>12} {density:>5} {cardinality:>7} {pattern_type:>8} {flags:<30}'.format(
+            **result) + ' {:6.2f}x time {:6.2f}x RSS'.format(
+            result['seconds'] / before['seconds'],
+            result['peak_rss_kb'] / before['peak_rss_kb'],
+        ))
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,67 @@
+import os
+import tempfile
+
+from the_searcher_benchmark import command_flags, generate_log, parse_size, run_once
+
+
+def test_parse_size():
+    assert parse_size('512') == 512
+    assert parse_size('1k') == 1024
+    assert parse_size('64M') == 64 << 20
+    assert parse_size('2G') == 2 << 30
+
+
+def test_generate_log():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log = os.path.join(tmp_dir, 'log.txt')
+        generate_log(log, 100000, 0.5, 10)
+        with open(log) as f:
+            lines = f.readlines()
+        assert 100000 <= sum(map(len, lines)) < 100000 + 100
+        assert 0.4 < sum('ERROR' in line for line in lines) / len(lines) < 0.6
+        assert len({line.split()[2] for line in lines}) == 10
+
+
+def test_command_flags():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        commands = os.path.join(tmp_dir, 'commands')
+        with open(commands, 'w') as f:
+            f.write('python3 the_searcher.py --help "\\w+"  the_searcher.py\n'
+                    'python3 the_searcher.py -s freq -o desc "\\w+\\s\\w"  the_searcher.py\n'
+                    'python3 -m the_searcher -c -l "\\w+"  the_searcher.py\n'
+                    'python3 the_searcher.py -c -e "\\w+" -e "def" the_searcher.py task_3\n'
+                    'python3 the_searcher.py "\\w+"  the_searcher.py\n')
+        assert command_flags(commands) == [
+            ['-s', 'freq', '-o', 'desc'],
+            ['-c', '-l'],
+            ['-c', '-e', '\\w+', '-e', 'def'],
+            [],
+        ]
+
+
+def test_peak_rss_of_searcher():
+    # memory of benchmark process is not counted as memory of searcher
+    ballast = b'x' * (200 << 20)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log = os.path.join(tmp_dir, 'log.txt')
+        generate_log(log, 10000, 0.5, 10)
+        seconds, peak_rss, returncode = run_once(['-c', 'ERROR', log])
+        assert returncode == 0
+        assert 0 < peak_rss < len(ballast) >> 10
+        del ballast
+
+        # memory of worker processes is counted
+        script = os.path.join(tmp_dir, 'workers.py')
+        with open(script, 'w') as f:
+            f.write('import subprocess, sys\n'
+                    'subprocess.run([sys.executable, "-c", "b\'x\' * (200 << 20)"], check=True)\n')
+        seconds, peak_rss, returncode = run_once([], script)
+        assert returncode == 0
+        assert peak_rss > 200 << 10
+
+
+if __name__ == '__main__':
+    test_parse_size()
+    test_generate_log()
+    test_command_flags()
+    test_peak_rss_of_searcher()
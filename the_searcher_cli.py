@@ -0,0 +1,294 @@
+"""Command line interface of the_searcher.
+
+Imported by the_searcher.main only for command lines, that need click
+(see the_searcher.fast_options).
+"""
+import json
+import os
+import sys
+import click
+from collections import Counter
+from itertools import islice
+
+import the_searcher
+from the_searcher import HyperLogLog, MultiSearcher, Profile, Searcher, add_to_summary, all_matches, \
+    can_map_file, echo_lines, follow_file, input_files, output_data, \
+    output_data_with_sorting_options, output_matches, output_records, \
+    output_stat_with_sorting_options, total_count, unique_matches
+
+
+help_strings = {
+    '-e': 'Pattern to search, can be repeated to search several patterns in one pass '
+          '(PATTERN argument is the first path then).',
+    '-f': 'File of patterns, one per line, searched in one pass like -e.',
+    '-u': 'List unique matches only.',
+    '-c': 'Total count of found matches.',
+    '-uc': 'Total count of unique matches.',
+    '-l': 'Total count of lines, where at least one match was found.',
+    '-s': 'Sorting of found matches by alphabet and frequency (related to all found matches)',
+    '-o': 'Sorting order can be specified (ascending, descending).',
+    '-n': 'List first N matches.',
+    '--stat': 'List unique matches with statistic (count or frequency in percents).',
+    '-j': 'Count of worker processes to search files in parallel (0 - count of CPUs).',
+    '--top': 'List only K most frequent matches (for --stat and sorted output).',
+    '--approx': 'Use bounded memory for huge count of unique matches, results are approximate.',
+    '--precision': 'Precision of approximate count of unique matches (-u -c --approx), '
+                   'uses 2^P bytes, error is about 1.04 / sqrt(2^P).',
+    '--index': 'Trigram index of files (see the_searcher_index.py) to skip lines '
+               'without literals of pattern. Without PATHS all indexed files are searched.',
+    '--follow': 'Watch growing file: print new matches as they come, '
+                'counts and statistics as snapshots after every change.',
+    '--interval': 'Seconds between checks of file in --follow mode.',
+    '--records': 'List records of matches: path, line number, byte offset and match.',
+    '-A': 'Print N lines of context after matched lines (regular files only).',
+    '-B': 'Print N lines of context before matched lines (regular files only).',
+    '--sort-memory': 'Memory (MB) of sorting (-s, -o), larger sets of matches '
+                     'are sorted by runs in temporary files.',
+    '--profile': 'Print time of stages (read, decode, match, count, sort, output) '
+                 'and counters of search as JSON to stderr.',
+}
+
+
+def follow_output(regex, filename, interval, flag_u, flag_c, flag_l,
+                  flag_s, flag_o, flag_n, stat, top, approx, precision):
+    """Output of searcher for growing file (--follow).
+
+    Counts and statistics are updated only by appended lines and printed
+    as snapshots after every change, in place on terminal. Matches
+    (no flags, -u, -n) are printed as they come.
+    """
+    polls = follow_file(regex, filename, interval)
+
+    # flags -u, -n and no flag: print new matches
+    if not (flag_l or stat or flag_c or flag_s or flag_o):
+        seen = set()
+        left = flag_n if flag_n and flag_n > 0 else None
+        for found in polls:
+            if flag_u:
+                matches = unique_matches(found, seen)
+            else:
+                matches = all_matches(found)
+            if left is not None:
+                matches = list(islice(matches, left))
+                left -= len(matches)
+            output_data(matches)
+            if left == 0:
+                return
+
+    if flag_l:
+        kind, summary = 'lines', 0
+    elif stat or flag_s or flag_o:
+        kind, summary = 'statistic', Counter()
+    elif flag_u:
+        kind, summary = 'unique', HyperLogLog(precision) if approx else set()
+    else:
+        kind, summary = 'count', 0
+
+    def value():
+        """Printed value of count or total count of matches of statistic."""
+        if kind == 'statistic':
+            return total_count(summary)
+        elif kind == 'unique':
+            return len(summary)
+        return summary
+
+    def snapshot():
+        if kind != 'statistic':
+            click.echo(value())
+            return
+
+        items = summary.most_common(top) if top else summary.items()
+        if stat:
+            output_stat_with_sorting_options(
+                items,
+                total_count(summary),
+                stat=stat,
+                flag_s=flag_s,
+                flag_o=flag_o,
+            )
+        else:
+            output_data_with_sorting_options(items, flag_s, flag_o)
+
+    previous = None
+    for found in polls:
+        summary = add_to_summary(kind, summary, found)
+
+        # print snapshot only if it is changed
+        if value() == previous:
+            continue
+        if previous is not None:
+            if sys.stdout.isatty():
+                click.clear()
+            else:
+                click.echo()
+        previous = value()
+        snapshot()
+
+
+def multi_output(engine, source, flag_u, flag_c, flag_l, flag_s, flag_o, stat, sort_memory=None):
+    """Output of searcher for several patterns (-e, -f).
+
+    Counts are printed as 'pattern | count' lines, lists and statistics
+    as sections, headed by their pattern and separated by empty lines.
+
+    Args:
+        engine(MultiSearcher): engine of all patterns.
+        source(dict): input of engine methods, paths or lines.
+    """
+    line = '{: >15} | {: >5}'.format
+
+    def output_counts(values):
+        echo_lines(line(pattern, value) for pattern, value in zip(engine.patterns, values))
+
+    def output_sections(values, output):
+        for i, (pattern, value) in enumerate(zip(engine.patterns, values)):
+            if i:
+                click.echo()
+            click.echo(f'{pattern}:')
+            output(value)
+
+    if flag_l:
+        output_counts(engine.count_lines(**source))
+
+    elif stat:
+        def output_stat(counter):
+            output_stat_with_sorting_options(
+                engine.statistic_items(counter),
+                total_count(counter),
+                stat=stat,
+                flag_s=flag_s,
+                flag_o=flag_o,
+                memory_limit=sort_memory,
+            )
+
+        output_sections(engine.statistic(**source), output_stat)
+
+    elif flag_u and flag_c:
+        output_counts(engine.count_unique(**source))
+
+    elif flag_c:
+        output_counts(engine.count(**source))
+
+    elif flag_u or flag_s or flag_o:
+        # Counter keeps matches in order of their first occurrence
+        def output_list(counter):
+            if flag_s or flag_o:
+                output_data_with_sorting_options(engine.statistic_items(counter), flag_s, flag_o,
+                                                 sort_memory)
+            else:
+                output_data(counter)
+
+        output_sections(engine.statistic(**source), output_list)
+
+    else:
+        raise click.UsageError('Several patterns work only with -c, -l, -u, -s, -o and --stat')
+
+
+def print_profile():
+    """Print report of profile of search to stderr and disable profiling."""
+    report = the_searcher.PROFILE.report()
+    the_searcher.PROFILE = None
+    click.echo(json.dumps(report), err=True)
+
+
+@click.command()
+@click.argument('pattern', required=False)
+@click.argument('paths', nargs=-1, type=click.Path(exists=True))
+@click.option('-e', 'patterns', multiple=True, help=help_strings['-e'])
+@click.option('-f', 'pattern_files', multiple=True, type=click.File('r'), help=help_strings['-f'])
+@click.option('-u', 'flag_u', is_flag=True, help=help_strings['-u'])
+@click.option('-c', 'flag_c', is_flag=True, help=help_strings['-c'])
+@click.option('-l', 'flag_l', is_flag=True, help=help_strings['-l'])
+@click.option('-s', 'flag_s', type=click.Choice(['abc', 'freq']), help=help_strings['-s'])
+@click.option('-o', 'flag_o', type=click.Choice(['asc', 'desc']), help=help_strings['-o'])
+@click.option('-n', 'flag_n', default=None, help=help_strings['-n'], type=int)
+@click.option('--stat', 'stat', type=click.Choice(['count', 'freq']), help=help_strings['--stat'])
+@click.option('-j', 'jobs', default=1, type=click.IntRange(min=0), help=help_strings['-j'])
+@click.option('--top', 'top', default=None, type=click.IntRange(min=1), help=help_strings['--top'])
+@click.option('--approx', 'approx', is_flag=True, help=help_strings['--approx'])
+@click.option('--precision', 'precision', default=12, type=click.IntRange(4, 18),
+              help=help_strings['--precision'])
+@click.option('--index', 'index_file', default=None, type=click.Path(exists=True, dir_okay=False),
+              help=help_strings['--index'])
+@click.option('--follow', 'follow', is_flag=True, help=help_strings['--follow'])
+@click.option('--interval', 'interval', default=1.0, type=click.FloatRange(min=0),
+              help=help_strings['--interval'])
+@click.option('--records', 'records', is_flag=True, help=help_strings['--records'])
+@click.option('-A', 'after', default=0, type=click.IntRange(min=0), help=help_strings['-A'])
+@click.option('-B', 'before', default=0, type=click.IntRange(min=0), help=help_strings['-B'])
+@click.option('--sort-memory', 'sort_memory', default=None, type=click.IntRange(min=1),
+              help=help_strings['--sort-memory'])
+@click.option('--profile', 'profile', is_flag=True, help=help_strings['--profile'])
+def searcher(pattern, paths, patterns, pattern_files, flag_u, flag_c, flag_l, flag_s, flag_o,
+             flag_n, stat, jobs, top, approx, precision, index_file, follow, interval,
+             records, after, before, sort_memory, profile):
+    """
+    """
+    # flag --profile: report is printed when command ends, even by error
+    if profile:
+        the_searcher.PROFILE = Profile()
+        click.get_current_context().call_on_close(print_profile)
+
+    # flags -e and -f: patterns are given by options, PATTERN is the first path
+    if patterns or pattern_files:
+        if pattern is not None:
+            if not os.path.exists(pattern):
+                raise click.BadParameter(f'Path "{pattern}" does not exist.', param_hint='PATHS')
+            paths = (pattern, *paths)
+        patterns = list(patterns)
+        for pattern_file in pattern_files:
+            patterns.extend(line.rstrip('\n') for line in pattern_file if line.strip('\n'))
+        if not patterns:
+            raise click.UsageError('No patterns in pattern files')
+        pattern = patterns[0]
+    elif pattern is None:
+        raise click.UsageError('Missing argument "PATTERN"')
+
+    if sort_memory is not None:
+        sort_memory <<= 20
+
+    engine_options = dict(jobs=jobs, index_file=index_file, top=top,
+                          approx=approx, precision=precision)
+    # input of engine: files of paths (or indexed files) or lines of stdin
+    if paths or index_file:
+        source = dict(paths=paths)
+    else:
+        source = dict(lines=click.get_text_stream('stdin'))
+
+    # several patterns are searched in one pass over input
+    if len(patterns) > 1:
+        if follow:
+            raise click.UsageError('--follow works with one pattern only')
+        engine = MultiSearcher(patterns, **engine_options)
+        multi_output(engine, source, flag_u, flag_c, flag_l, flag_s, flag_o, stat, sort_memory)
+        return
+
+    # pattern is compiled once per invocation
+    engine = Searcher(pattern, **engine_options)
+
+    # flag --follow: search only appended lines of growing file
+    if follow:
+        if len(paths) != 1 or not os.path.isfile(paths[0]):
+            raise click.UsageError('--follow works with exactly one regular file')
+        follow_output(engine.regex, paths[0], interval, flag_u, flag_c, flag_l,
+                      flag_s, flag_o, flag_n, stat, top, approx, precision)
+        return
+
+    # flags --records, -A and -B: records of matches, context is read lazily
+    if records or after or before:
+        if (after or before) and ('lines' in source or
+                                  not all(map(can_map_file, input_files(paths)))):
+            raise click.UsageError('-A and -B work only with regular files')
+        found_records = engine.records(**source)
+        if flag_n and flag_n > 0:
+            found_records = islice(found_records, flag_n)
+        output_records(found_records, before, after)
+        return
+
+    # matches are never stored: each flag consumes stream of per-line matches
+    # or merges summaries of parts of files, found by worker processes
+    output_matches(engine, source, flag_u, flag_c, flag_l, flag_s, flag_o, flag_n, stat, sort_memory)
+
+
+if __name__ == '__main__':
+    searcher()
@@ -0,0 +1,228 @@
+"""Persistent trigram index of files for the_searcher.
+
+For each file index keeps offsets of blocks of lines and, for each
+trigram (3 bytes) of file, numbers of blocks containing it. Search with
+index runs regex only on blocks, that contain all trigrams of literals
+required by pattern. Files changed after indexing (other mtime or size)
+and not indexed files are searched entirely.
+
+Usage:
+    python3 the_searcher_index.py --index logs.idx logs/
+    python3 the_searcher.py --index logs.idx "ERROR \\d+"
+"""
+import mmap
+import os
+import re
+import sqlite3
+import click
+from array import array
+from collections import defaultdict
+
+from the_searcher import can_map_file, input_files, line_ranges, required_literals
+
+
+DEFAULT_INDEX = 'the_searcher.idx'
+
+# size of indexed block of lines
+INDEX_BLOCK_SIZE = 1 << 16
+
+# all overlapping trigrams of text
+TRIGRAMS = re.compile(rb'(?=(...))', re.DOTALL)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    offsets BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    trigram BLOB NOT NULL,
+    file_id INTEGER NOT NULL,
+    blocks BLOB NOT NULL,
+    PRIMARY KEY (trigram, file_id)
+) WITHOUT ROWID;
+'''
+
+
+# ends of lines: literals are found in text with translated newlines,
+# while raw bytes can have \r\n or \r there, and blocks are split after them
+LINE_ENDS = re.compile('[\r\n]')
+
+
+def pattern_trigrams(regex):
+    """Trigrams, that are in every match of regex."""
+    trigrams = set()
+    for literal in required_literals(regex):
+        for part in LINE_ENDS.split(literal):
+            part = part.encode('utf-8', 'surrogatepass')
+            trigrams.update(part[i:i + 3] for i in range(len(part) - 2))
+    return trigrams
+
+
+def join_blocks(blocks, offsets):
+    """Join sorted numbers of blocks into (start, end) ranges of file."""
+    start = end = None
+    for block in blocks:
+        if block != end:
+            if start is not None:
+                yield offsets[start], offsets[end]
+            start = block
+        end = block + 1
+    if start is not None:
+        yield offsets[start], offsets[end]
+
+
+class TrigramIndex:
+    """Trigram index of files, stored in SQLite database.
+
+    """
+    def __init__(self, filename=DEFAULT_INDEX):
+        self._filename = os.path.abspath(filename)
+        self._db = sqlite3.connect(filename)
+        self._db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self._db.close()
+
+    def _file_entry(self, path):
+        """Entry of indexed file, None if file is not indexed, changed or deleted."""
+        row = self._db.execute(
+            'SELECT id, mtime_ns, size, offsets FROM files WHERE path = ?',
+            (os.path.abspath(path),)
+        ).fetchone()
+        if row is None:
+            return None
+
+        file_id, mtime_ns, size, offsets = row
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if (stat.st_mtime_ns, stat.st_size) != (mtime_ns, size):
+            return None
+        return file_id, array('Q', offsets)
+
+    def _indexed_paths(self):
+        return [row[0] for row in self._db.execute('SELECT path FROM files ORDER BY path')]
+
+    def indexed_files(self):
+        """Paths of indexed files, deleted ones are skipped until update forgets them."""
+        return [path for path in self._indexed_paths() if os.path.isfile(path)]
+
+    def add_file(self, path):
+        """Index file, replacing its old entry."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        offsets = array('Q', [0])
+        postings = defaultdict(lambda: array('I'))
+
+        if stat.st_size:
+            with open(path, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                blocks = line_ranges(buffer, 0, stat.st_size, INDEX_BLOCK_SIZE)
+                for number, (start, end) in enumerate(blocks):
+                    for trigram in set(TRIGRAMS.findall(buffer, start, end)):
+                        postings[trigram].append(number)
+                    offsets.append(end)
+
+        with self._db:
+            self._remove(path)
+            file_id = self._db.execute(
+                'INSERT INTO files (path, mtime_ns, size, offsets) VALUES (?, ?, ?, ?)',
+                (path, stat.st_mtime_ns, stat.st_size, offsets.tobytes())
+            ).lastrowid
+            self._db.executemany(
+                'INSERT INTO postings (trigram, file_id, blocks) VALUES (?, ?, ?)',
+                ((trigram, file_id, blocks.tobytes())
+                 for trigram, blocks in postings.items())
+            )
+
+    def _remove(self, path):
+        row = self._db.execute('SELECT id FROM files WHERE path = ?', (path,)).fetchone()
+        if row is not None:
+            self._db.execute('DELETE FROM postings WHERE file_id = ?', row)
+            self._db.execute('DELETE FROM files WHERE id = ?', row)
+
+    def update(self, paths):
+        """Index new and changed files of paths, forget deleted files.
+
+        Returns:
+            int: count of indexed files.
+        """
+        indexed = 0
+        for path in input_files(paths):
+            if os.path.abspath(path) == self._filename:
+                continue
+            if can_map_file(path) and self._file_entry(path) is None:
+                self.add_file(path)
+                indexed += 1
+
+        with self._db:
+            for path in self._indexed_paths():
+                if not os.path.isfile(path):
+                    self._remove(path)
+        return indexed
+
+    def candidate_blocks(self, file_id, trigrams):
+        """Sorted numbers of blocks of file, that contain all trigrams."""
+        blocks = None
+        for trigram in trigrams:
+            row = self._db.execute(
+                'SELECT blocks FROM postings WHERE trigram = ? AND file_id = ?',
+                (trigram, file_id)
+            ).fetchone()
+            if row is None:
+                return []
+            found = set(array('I', row[0]))
+            blocks = found if blocks is None else blocks & found
+            if not blocks:
+                return []
+        return sorted(blocks)
+
+    def candidate_ranges(self, regex, paths):
+        """Ranges of files of paths, that can have matches of regex.
+
+        Yields:
+            tuple: filename, start and end offsets of range, like input_ranges.
+            Not indexed and changed files are yielded entirely
+            as (filename, 0, None).
+        """
+        trigrams = pattern_trigrams(regex)
+        for filename in input_files(paths):
+            # file deleted after indexing has nothing to search
+            if not os.path.isfile(filename):
+                continue
+            entry = self._file_entry(filename)
+            if entry is None or not trigrams:
+                yield filename, 0, None
+                continue
+
+            file_id, offsets = entry
+            blocks = self.candidate_blocks(file_id, trigrams)
+            for start, end in join_blocks(blocks, offsets):
+                yield filename, start, end
+
+
+@click.command()
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--index', 'index_file', default=DEFAULT_INDEX, type=click.Path(dir_okay=False),
+              help='File of index, created if not exists.')
+def index(paths, index_file):
+    """Build or update trigram index of files for the_searcher.py --index.
+
+    Only new and changed files are indexed, count of them is printed.
+    """
+    with TrigramIndex(index_file) as trigram_index:
+        click.echo(trigram_index.update(paths))
+
+
+if __name__ == '__main__':
+    index()
@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+
+from click.testing import CliRunner
+
+import the_searcher_index
+from the_searcher import compile_pattern, searcher
+from the_searcher_index import TrigramIndex, index, join_blocks, pattern_trigrams
+
+
+runner = CliRunner()
+
+pattern = "[A-Z].[a-z]+"
+file = "fortest.txt"
+
+
+def output_chech(result, expected):
+    """"""
+    return result.output.splitlines() == expected.splitlines()
+
+
+def test_pattern_trigrams():
+    assert pattern_trigrams(compile_pattern(r'ERROR \d+')) == \
+        {b'ERR', b'RRO', b'ROR', b'OR '}
+    assert pattern_trigrams(compile_pattern(pattern)) == set()
+    # raw bytes can have other ends of lines than text
+    assert pattern_trigrams(compile_pattern('abc\ndef\rg')) == {b'abc', b'def'}
+
+
+def test_join_blocks():
+    offsets = [0, 10, 20, 30, 40]
+    assert list(join_blocks([0, 1, 3], offsets)) == [(0, 20), (30, 40)]
+    assert list(join_blocks([], offsets)) == []
+
+
+def test_search_with_index():
+    block_size = the_searcher_index.INDEX_BLOCK_SIZE
+    the_searcher_index.INDEX_BLOCK_SIZE = 16
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index_file = os.path.join(tmp_dir, 'test.idx')
+            text_file = os.path.join(tmp_dir, file)
+            shutil.copy(file, text_file)
+
+            result = runner.invoke(index, ['--index', index_file, tmp_dir])
+            assert output_chech(result, '1')
+            # nothing changed, nothing to index
+            result = runner.invoke(index, ['--index', index_file, tmp_dir])
+            assert output_chech(result, '0')
+
+            with TrigramIndex(index_file) as trigram_index:
+                ranges = list(trigram_index.candidate_ranges(
+                    compile_pattern('Egypt'), [text_file]))
+                assert len(ranges) == 1
+
+            result = runner.invoke(searcher, ['--index', index_file, '-c', 'Egypt'])
+            assert output_chech(result, '2')
+            result = runner.invoke(searcher, ['--index', index_file, '-c', 'Cairo'])
+            assert output_chech(result, '0')
+            result = runner.invoke(searcher, ['--index', index_file, '-u', pattern, text_file])
+            assert output_chech(result, 'National\nPolice\nAlexandria\nEgypt\n')
+
+            # changed file is searched entirely until it is indexed again
+            with open(text_file, 'a') as f:
+                f.write('Cairo\n')
+            result = runner.invoke(searcher, ['--index', index_file, '-c', 'Cairo'])
+            assert output_chech(result, '1')
+    finally:
+        the_searcher_index.INDEX_BLOCK_SIZE = block_size
+
+
+def test_deleted_indexed_file():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_file = os.path.join(tmp_dir, 'test.idx')
+        kept, deleted = os.path.join(tmp_dir, 'a.txt'), os.path.join(tmp_dir, 'b.txt')
+        shutil.copy(file, kept)
+        shutil.copy(file, deleted)
+        result = runner.invoke(index, ['--index', index_file, kept, deleted])
+        assert output_chech(result, '2')
+
+        # deleted file is skipped by search until index is updated
+        os.remove(deleted)
+        with TrigramIndex(index_file) as trigram_index:
+            assert trigram_index.indexed_files() == [kept]
+        result = runner.invoke(searcher, ['--index', index_file, '-c', 'Egypt'])
+        assert output_chech(result, '2')
+        result = runner.invoke(searcher, ['--index', index_file, '-c', pattern])
+        assert output_chech(result, '5')
+        result = runner.invoke(searcher, ['--index', index_file, '--records', 'Egypt'])
+        assert result.exit_code == 0
+        assert len(result.output.splitlines()) == 2
+        result = runner.invoke(index, ['--index', index_file, tmp_dir])
+        assert output_chech(result, '0')
+        with TrigramIndex(index_file) as trigram_index:
+            assert trigram_index._indexed_paths() == [kept]
+
+
+
+def test_crlf_file_with_index():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_file = os.path.join(tmp_dir, 'test.idx')
+        text_file = os.path.join(tmp_dir, 'crlf.txt')
+        with open(text_file, 'wb') as f:
+            f.write(b'abc\r\nxyz\r\n')
+        result = runner.invoke(index, ['--index', index_file, text_file])
+        assert output_chech(result, '1')
+        for flag in ('-c', '-l'):
+            result = runner.invoke(searcher, [flag, 'bc\n', text_file])
+            assert output_chech(result, '1')
+            result = runner.invoke(searcher, ['--index', index_file, flag, 'bc\n', text_file])
+            assert output_chech(result, '1')
+
+
+if __name__ == '__main__':
+    test_pattern_trigrams()
+    test_join_blocks()
+    test_search_with_index()
+    test_deleted_indexed_file()
+    test_crlf_file_with_index()
@@ -0,0 +1,267 @@
+"""Search service for the_searcher: asyncio server with pool of processes.
+
+Server keeps pool of worker processes, so compiled patterns (cached by
+compile_pattern) and imported modules stay warm between requests, and
+clients don't pay interpreter startup for every search.
+
+Protocol: client sends requests as JSON lines, server answers every
+request with JSON lines:
+    {"result": ...} - for summaries (count, lines, count_unique, unique, statistic),
+    {"matches": [...]} ... {"done": true} - for streams (matches, records),
+    {"error": "..."} - for bad requests and failed searches (it can
+        follow several {"matches": [...]} lines of stream).
+
+Request fields:
+    pattern(str): regular expression, required.
+    paths(list): files and directories to search, required.
+    mode(str): count (default), lines, count_unique, unique, statistic,
+        matches or records.
+    top(int): only K most frequent matches of statistic.
+    limit(int): only first N matches of streams.
+
+Usage:
+    python3 the_searcher_server.py --socket /tmp/the_searcher.sock
+    echo '{"pattern": "ERROR \\\\d+", "paths": ["logs"]}' | nc -U /tmp/the_searcher.sock
+"""
+import asyncio
+import json
+import os
+import re
+import click
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+from the_searcher import compile_pattern, file_records, input_ranges, merge_summaries, \
+    range_line_count, range_records, summarize_range
+
+
+DEFAULT_SOCKET = '/tmp/the_searcher.sock'
+
+# count of matches in one answer line of stream
+STREAM_BATCH_SIZE = 1024
+
+# summary kinds of modes
+SUMMARY_KINDS = {
+    'count': 'count',
+    'lines': 'lines',
+    'count_unique': 'unique',
+    'unique': 'unique',
+    'statistic': 'statistic',
+}
+STREAM_MODES = {'matches', 'records'}
+
+
+def range_record_list(regex, file_range, limit=None):
+    """Records of matches of range of file as lists, runs in worker process.
+
+    Lines are numbered from 1 at the start of range, so count of lines
+    of range is returned too. Not mapped files (range end is None)
+    can't be split into ranges, they are skipped: stream reads them itself.
+
+    Returns:
+        tuple: file_range, list of records and count of lines.
+    """
+    if file_range[2] is None:
+        return file_range, None, None
+    records = [list(record) for record in islice(range_records(regex, file_range), limit)]
+    return file_range, records, range_line_count(file_range)
+
+
+def record_list_batch(records):
+    """The next batch of records of generator as lists, runs in thread."""
+    return [list(record) for record in islice(records, STREAM_BATCH_SIZE)]
+
+
+def summary_result(mode, summary, top=None):
+    """JSON compatible result of summary of mode."""
+    if mode == 'count_unique':
+        return len(summary)
+    elif mode == 'unique':
+        return sorted(summary)
+    elif mode == 'statistic':
+        return summary.most_common(top) if top else list(summary.items())
+    return summary
+
+
+class SearchServer:
+    """Asyncio search server, scans run in pool of processes.
+
+    Ranges of files are searched by all workers in parallel and several
+    requests (of one or many clients) share the pool.
+    """
+    def __init__(self, jobs=None):
+        self.jobs = jobs or os.cpu_count()
+        self._executor = ProcessPoolExecutor(max_workers=self.jobs)
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    async def _map(self, worker, items):
+        """Results of worker for items in their order, a few items per worker ahead."""
+        loop = asyncio.get_running_loop()
+        pending = deque()
+        try:
+            for item in items:
+                pending.append(loop.run_in_executor(self._executor, worker, item))
+                if len(pending) >= 2 * self.jobs:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def summary(self, regex, paths, kind):
+        """Summary of given kind of all files of paths, see summarize."""
+        worker = partial(summarize_range, regex, kind)
+        summaries = [summary async for summary in self._map(worker, input_ranges(paths))]
+        return merge_summaries(kind, summaries)
+
+    async def _records(self, regex, paths, limit=None):
+        """Lists of records of all files of paths in their order.
+
+        Mapped files are searched by ranges in pool, so no worker keeps
+        records of the whole file. Other (e.g. compressed) files are read
+        by batches of records in thread.
+        """
+        loop = asyncio.get_running_loop()
+        ranges = self._map(partial(range_record_list, regex, limit=limit), input_ranges(paths))
+        try:
+            async for (filename, start, end), records, lines in ranges:
+                if records is None:
+                    found = file_records(regex, filename)
+                    try:
+                        while True:
+                            batch = await loop.run_in_executor(None, record_list_batch, found)
+                            if not batch:
+                                break
+                            yield batch
+                    finally:
+                        # cancelled batch is still read by thread, it ends with it
+                        if not found.gi_running:
+                            found.close()
+                    continue
+
+                # lines of range are numbered after lines of previous ranges of file
+                if start == 0:
+                    line = 0
+                for record in records:
+                    record[1] += line
+                line += lines
+                yield records
+        finally:
+            await ranges.aclose()
+
+    async def stream(self, regex, paths, mode, limit=None):
+        """Batches of matches or records of all files of paths in their order."""
+        if mode == 'records':
+            parts = self._records(regex, paths, limit)
+        else:
+            parts = self._map(partial(summarize_range, regex, 'matches'), input_ranges(paths))
+
+        try:
+            async for part in parts:
+                if limit is not None:
+                    part = part[:limit]
+                    limit -= len(part)
+                for start in range(0, len(part), STREAM_BATCH_SIZE):
+                    yield part[start:start + STREAM_BATCH_SIZE]
+                if limit == 0:
+                    break
+        finally:
+            # not started work of ranges is cancelled
+            await parts.aclose()
+
+    async def answer(self, request, send):
+        """Answer one request by JSON objects, passed to send coroutine."""
+        try:
+            regex = compile_pattern(request['pattern'])
+            paths = request['paths']
+            mode = request.get('mode', 'count')
+            limit = request.get('limit')
+            top = request.get('top')
+            if not isinstance(paths, list) or not all(map(os.path.exists, paths)):
+                raise ValueError('paths must be list of existing files and directories')
+            if mode not in SUMMARY_KINDS and mode not in STREAM_MODES:
+                raise ValueError(f'Unknown mode: {mode}')
+            if limit is not None and (not isinstance(limit, int) or limit < 1):
+                raise ValueError('limit must be positive integer')
+            if top is not None and (not isinstance(top, int) or top < 1):
+                raise ValueError('top must be positive integer')
+        except (KeyError, TypeError, ValueError, re.error) as error:
+            await send({'error': f'Bad request: {error}'})
+            return
+
+        try:
+            if mode in STREAM_MODES:
+                async for batch in self.stream(regex, paths, mode, limit):
+                    await send({'matches': batch})
+                await send({'done': True})
+            else:
+                summary = await self.summary(regex, paths, SUMMARY_KINDS[mode])
+                await send({'result': summary_result(mode, summary, top)})
+        except ConnectionError:
+            raise
+        except Exception as error:
+            # e.g. file is not decoded, the next requests are served
+            await send({'error': f'Search failed: {type(error).__name__}: {error}'})
+
+    async def handle(self, reader, writer):
+        """Answer all requests of client connection one by one."""
+        async def send(answer):
+            writer.write(json.dumps(answer).encode() + b'\n')
+            await writer.drain()
+
+        try:
+            async for line in reader:
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError as error:
+                    await send({'error': f'Bad request: {error}'})
+                    continue
+                if not isinstance(request, dict):
+                    await send({'error': 'Bad request: request must be JSON object'})
+                    continue
+                await self.answer(request, send)
+        except ConnectionError:
+            # client has gone, the rest of its work is cancelled
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path=None, port=None):
+        """Serve clients on unix socket or on localhost TCP port forever."""
+        if port is not None:
+            server = await asyncio.start_server(self.handle, '127.0.0.1', port)
+        else:
+            server = await asyncio.start_unix_server(self.handle, socket_path)
+        async with server:
+            await server.serve_forever()
+
+
+@click.command()
+@click.option('--socket', 'socket_path', default=DEFAULT_SOCKET, type=click.Path(dir_okay=False),
+              help='Unix socket to listen.')
+@click.option('--port', 'port', default=None, type=click.IntRange(1, 65535),
+              help='Listen localhost TCP port instead of unix socket.')
+@click.option('-j', 'jobs', default=0, type=click.IntRange(min=0),
+              help='Count of worker processes (0 - count of CPUs).')
+def serve(socket_path, port, jobs):
+    """Run search service for the_searcher, see module docstring for protocol."""
+    server = SearchServer(jobs)
+    try:
+        asyncio.run(server.serve(socket_path, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if port is None and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+if __name__ == '__main__':
+    serve()
@@ -0,0 +1,117 @@
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+import the_searcher
+from the_searcher import Searcher
+from the_searcher_server import SearchServer
+
+
+pattern = "[A-Z].[a-z]+"
+file = "fortest.txt"
+
+
+async def ask(socket_path, *requests):
+    """Send requests by one connection, return list of answers of every request."""
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    answers = []
+    for request in requests:
+        writer.write(json.dumps(request).encode() + b'\n')
+        await writer.drain()
+        answer = [json.loads(await reader.readline())]
+        while 'matches' in answer[-1]:
+            answer.append(json.loads(await reader.readline()))
+        answers.append(answer)
+    writer.close()
+    await writer.wait_closed()
+    return answers
+
+
+async def serve_and_ask(socket_path, requests):
+    server = SearchServer(jobs=2)
+    task = asyncio.ensure_future(server.serve(socket_path))
+    try:
+        while not os.path.exists(socket_path):
+            await asyncio.sleep(0.01)
+        # several clients at once
+        return await asyncio.gather(*(ask(socket_path, *requests) for _ in range(3)))
+    finally:
+        task.cancel()
+        server.close()
+
+
+def test_search_server():
+    requests = [
+        {'pattern': pattern, 'paths': [file]},
+        {'pattern': pattern, 'paths': [file, file], 'mode': 'lines'},
+        {'pattern': pattern, 'paths': [file], 'mode': 'count_unique'},
+        {'pattern': pattern, 'paths': [file], 'mode': 'statistic', 'top': 1},
+        {'pattern': pattern, 'paths': [file], 'mode': 'matches', 'limit': 2},
+        {'pattern': 'Egypt', 'paths': [file], 'mode': 'records'},
+        {'pattern': '(', 'paths': [file]},
+        {'pattern': pattern, 'paths': ['no such file']},
+    ]
+    expected = [
+        [{'result': 5}],
+        [{'result': 8}],
+        [{'result': 4}],
+        [{'result': [['Egypt', 2]]}],
+        [{'matches': ['National', 'Police']}, {'done': True}],
+        [{'matches': [[file, 4, 55, [74, 79], 'Egypt'], [file, 5, 85, [104, 109], 'Egypt']]},
+         {'done': True}],
+    ]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        socket_path = os.path.join(tmp_dir, 'test.sock')
+        for answers in asyncio.run(serve_and_ask(socket_path, requests)):
+            assert answers[:len(expected)] == expected
+            assert all('error' in answer[0] for answer in answers[len(expected):])
+
+
+def test_server_errors_and_records():
+    range_size = the_searcher.PARALLEL_RANGE_SIZE
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        text_file = os.path.join(tmp_dir, 'text.txt')
+        with open(file) as src, open(text_file, 'w') as dst:
+            dst.write(src.read() * 50)
+        with open(text_file, 'rb') as src, gzip.open(text_file + '.gz', 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        binary_file = os.path.join(tmp_dir, 'binary.txt')
+        with open(binary_file, 'wb') as f:
+            f.write(b'\xff\xfe Egypt\n')
+
+        requests = [
+            {'pattern': pattern, 'paths': [file], 'mode': 'statistic', 'top': 'a'},
+            {'pattern': pattern, 'paths': [binary_file]},
+            {'pattern': 'Egypt', 'paths': [text_file]},
+            {'pattern': 'Egypt', 'paths': [text_file, text_file + '.gz'], 'mode': 'records'},
+            {'pattern': 'Egypt', 'paths': [text_file], 'mode': 'records', 'limit': 3},
+        ]
+        socket_path = os.path.join(tmp_dir, 'test.sock')
+        # files are searched by many small ranges
+        the_searcher.PARALLEL_RANGE_SIZE = 100
+        try:
+            all_answers = asyncio.run(serve_and_ask(socket_path, requests))
+        finally:
+            the_searcher.PARALLEL_RANGE_SIZE = range_size
+
+        # records as they are seen through JSON
+        records = json.loads(json.dumps(list(Searcher('Egypt').records([text_file]))))
+        gz_records = json.loads(json.dumps(list(Searcher('Egypt').records([text_file + '.gz']))))
+        assert len(records) == 100
+        for answers in all_answers:
+            # errors of request and of search don't break connection
+            assert 'error' in answers[0][0] and 'error' in answers[1][0]
+            assert answers[2] == [{'result': 100}]
+            assert answers[3][-1] == {'done': True}
+            found = [record for answer in answers[3][:-1] for record in answer['matches']]
+            assert found == records + gz_records
+            assert answers[4][-1] == {'done': True}
+            assert [record for answer in answers[4][:-1] for record in answer['matches']] == records[:3]
+
+
+if __name__ == '__main__':
+    test_search_server()
+    test_server_errors_and_records()
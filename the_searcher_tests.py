@@ -1,6 +1,17 @@
+import bz2
+import gzip
+import json
+import lzma
+import os
+import subprocess
+import sys
+import tempfile
+from operator import itemgetter
+
 from click.testing import CliRunner
 
-from the_searcher import searcher
+from the_searcher import searcher, search_lines, first_matches, compile_pattern
+import the_searcher
 
 
 TEST_TEXT = 'acts of civil disobedience,\n' \
@@ -66,6 +77,12 @@ TEST_RESULTS = {
                                    '       National |   0.2\n'
                                    '         Police |   0.2\n'
                                    '     Alexandria |   0.2\n',
+
+    '--stat count --top 2': '          Egypt |     2\n'
+                            '       National |     1\n',
+
+    '-s abc --top 2': 'Egypt\n'
+                      'National\n',
 }
 
 
@@ -191,18 +208,447 @@ def list_of_matches_sorting():
     assert result2.output == result1.output
 
 
+def test_external_sort():
+    items = [(f'match{i % 37}', i % 5) for i in range(1000)]
+    for key in (0, 1):
+        for reverse in (False, True):
+            expected = sorted(items, key=itemgetter(key), reverse=reverse)
+            # runs of about 20 items are sorted on disk and merged
+            found = the_searcher.sorted_items(items, itemgetter(key), reverse, memory_limit=2000)
+            assert list(found) == expected
+            found = the_searcher.sorted_items(items, itemgetter(key), reverse)
+            assert found == expected
+
+    memory_limit = the_searcher.SORT_MEMORY_LIMIT
+    the_searcher.SORT_MEMORY_LIMIT = 200
+    try:
+        for args in (['-s', 'freq', '-o', 'desc'], ['--stat', 'count', '-s', 'abc'], ['-u', '-o', 'desc']):
+            result = runner.invoke(searcher, [*args, pattern, file])
+            the_searcher.SORT_MEMORY_LIMIT = memory_limit
+            expected = runner.invoke(searcher, [*args, pattern, file])
+            the_searcher.SORT_MEMORY_LIMIT = 200
+            assert result.output == expected.output
+    finally:
+        the_searcher.SORT_MEMORY_LIMIT = memory_limit
+
+
+def test_counting_fast_paths():
+    lines = ['ERROR 12 user7 x\n', 'INFO user12 user3\n', '\n', 'Ünïcode ERROR 7\n', 'a\rb ERROR 1 \n', 'tail']
+    patterns = [r'ERROR \d+', r'user\d+', r'\w+\s\w', r'^\w+', r'\d*', r'(\w)(\d)', r'(?i)error', 'x$']
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ascii_file = os.path.join(tmp_dir, 'ascii.txt')
+        with open(ascii_file, 'w', newline='') as f:
+            f.write(''.join(line for line in lines if line.isascii() and '\r' not in line))
+        mixed_file = os.path.join(tmp_dir, 'mixed.txt')
+        with open(mixed_file, 'w', encoding='utf-8', newline='') as f:
+            f.write(''.join(lines))
+
+        for pattern in patterns:
+            engine = the_searcher.Searcher(pattern)
+            for path in (ascii_file, mixed_file):
+                # the same counts as of lists of matches
+                assert engine.count([path]) == the_searcher.count_matches(engine.found([path]))
+                assert engine.count_lines([path]) == the_searcher.count_lines(engine.found([path]))
+            assert engine.count(lines=lines) == the_searcher.count_matches(search_lines(pattern, lines))
+            assert the_searcher.count_lines_with_matches(pattern, lines) == \
+                len(list(search_lines(pattern, lines)))
+
+
+def test_first_matches_stops_reading():
+    def lines():
+        yield from TEST_TEXT.splitlines(keepends=True)[:2]
+        raise AssertionError('input must not be read after N matches')
+
+    result = list(first_matches(search_lines(pattern, lines()), 2))
+    assert result == TEST_RESULTS['-n 2'].splitlines()
+
+
+def test_compiled_pattern_reuse():
+    regex = compile_pattern(pattern)
+    assert compile_pattern(pattern) is regex
+    assert compile_pattern(regex) is regex
+    result = [m for ms in search_lines(regex, TEST_TEXT.splitlines()) for m in ms]
+    assert result == TEST_RESULTS[' '].splitlines()
+
+
+def test_mapped_file_search():
+    mixed = 'Café Alexandria\r\nin Egypt\x1c[12]\n' + TEST_TEXT
+    patterns = [pattern, r'\w+\s\w', r'^\w+', r'(\w)(\d)?', r'\S+$']
+    chunk_size = the_searcher.MMAP_CHUNK_SIZE
+    the_searcher.MMAP_CHUNK_SIZE = 16
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        mixed_file = os.path.join(tmp_dir, 'mixed.txt')
+        with open(mixed_file, 'wb') as f:
+            f.write(mixed.encode('utf-8'))
+
+        try:
+            for name in (file, mixed_file):
+                for p in patterns:
+                    regex = compile_pattern(p)
+                    with open(name, encoding='utf-8') as text_lines:
+                        expected = list(search_lines(regex, text_lines))
+                    found = the_searcher.search_mapped_file(regex, name, 'utf-8')
+                    assert list(the_searcher.all_matches(found)) == \
+                        list(the_searcher.all_matches(expected))
+                    found = the_searcher.search_mapped_file(regex, name, 'utf-8')
+                    assert the_searcher.count_lines(found) == len(expected)
+        finally:
+            the_searcher.MMAP_CHUNK_SIZE = chunk_size
+
+
+def test_parallel_search():
+    range_size = the_searcher.PARALLEL_RANGE_SIZE
+    the_searcher.PARALLEL_RANGE_SIZE = 16
+    try:
+        for key in ('-u', '-c', '-u -c', '-l', '--stat count', '-n 2', ' '):
+            result = runner.invoke(searcher, ['-j', '2', *key.split(), pattern, file])
+            assert output_chech(result, TEST_RESULTS[key])
+
+        result = runner.invoke(searcher, ['-j', '2', '-c', pattern, file, file])
+        assert output_chech(result, '10')
+    finally:
+        the_searcher.PARALLEL_RANGE_SIZE = range_size
+
+    # matches of ranges know count of their lines
+    found = list(the_searcher.Searcher(pattern, jobs=2).found([file, file]))
+    assert the_searcher.count_lines(found) == 2 * int(TEST_RESULTS['-l'])
+    assert [m for matches in found for m in matches] == TEST_RESULTS[' '].split() * 2
+
+
+def test_top_matches():
+    for key in ('--stat count --top 2', '-s abc --top 2'):
+        result1 = runner.invoke(searcher, [*key.split(), pattern, file])
+        result2 = runner.invoke(searcher, [*key.split(), '--approx', pattern, file])
+        assert output_chech(result1, TEST_RESULTS[key])
+        assert output_chech(result2, TEST_RESULTS[key])
+
+
+def test_space_saving_sketch():
+    sketch = the_searcher.SpaceSaving(10)
+    # 'a' and 'b' are frequent, other matches are noise
+    for i in range(1000):
+        sketch.update(['a', 'b', str(i), 'a'])
+    assert len(sketch.items()) == 10
+    assert [m for m, _ in sketch.most_common(2)] == ['a', 'b']
+    assert sketch.total() == 4000
+
+    count, error = dict(sketch.items())['a'], sketch.error('a')
+    assert count - error <= 2000 <= count
+
+    # match evicted from one part keeps overestimated count after merge
+    first, second = the_searcher.SpaceSaving(10), the_searcher.SpaceSaving(10)
+    first.update(['x'] * 100)
+    second.update(['x'] * 40 + [str(i) for i in range(500)])
+    first.merge(second)
+    assert first.total() == 640
+    count, error = dict(first.items())['x'], first.error('x')
+    assert count - error <= 140 <= count
+    assert first.most_common(1)[0][0] == 'x'
+
+
+def test_approximate_unique_count():
+    result = runner.invoke(searcher, ['-u', '-c', '--approx', pattern, file])
+    assert output_chech(result, TEST_RESULTS['-u -c'])
+
+    sketch1 = the_searcher.HyperLogLog(12)
+    sketch2 = the_searcher.HyperLogLog(12)
+    sketch1.update(str(i) for i in range(60000))
+    sketch2.update(str(i) for i in range(40000, 100000))
+    assert abs(len(sketch1) - 60000) < 60000 * 0.05
+
+    sketch1.merge(sketch2)
+    assert abs(len(sketch1) - 100000) < 100000 * 0.05
+
+
+def test_required_literal():
+    literals = {
+        r'ERROR \d+': 'ERROR ',
+        r'(a|b)cde': 'cde',
+        r'a(bc)+d': 'bc',
+        r'a(bc)*d': 'a',
+        r'(?i)abc': None,
+        pattern: None,
+    }
+    for p, literal in literals.items():
+        assert the_searcher.required_literal(compile_pattern(p)) == literal
+
+    result = runner.invoke(searcher, ['-c', r'of \w+', file])
+    assert output_chech(result, '3')
+
+
+def test_compressed_files():
+    block_size = the_searcher.DECOMPRESS_BLOCK_SIZE
+    the_searcher.DECOMPRESS_BLOCK_SIZE = 7
+    with open(file, 'rb') as f:
+        text = f.read()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            for module in (gzip, bz2, lzma):
+                # compressed file name doesn't matter, only its content
+                compressed_file = os.path.join(tmp_dir, module.__name__)
+                with module.open(compressed_file, 'wb') as f:
+                    f.write(text)
+
+                for key in ('-u', '-c', '-l', '--stat count', '-n 2', ' '):
+                    result = runner.invoke(searcher, [*key.split(), pattern, compressed_file])
+                    assert output_chech(result, TEST_RESULTS[key])
+
+            # empty compressed file
+            with bz2.open(compressed_file, 'wb'):
+                pass
+            assert the_searcher.compressed_opener(compressed_file) is bz2.open
+            # text can start with magic bytes of bz2
+            text_file = os.path.join(tmp_dir, 'text.txt')
+            with open(text_file, 'w') as f:
+                f.write('BZhang logged in\nERROR x\n')
+            assert the_searcher.compressed_opener(text_file) is None
+            result = runner.invoke(searcher, ['-c', 'ERROR', text_file])
+            assert output_chech(result, '1')
+        finally:
+            the_searcher.DECOMPRESS_BLOCK_SIZE = block_size
+
+
+def test_follow_file():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_file = os.path.join(tmp_dir, 'log.txt')
+        with open(log_file, 'w') as f:
+            f.write(TEST_TEXT[:28])
+        polls = the_searcher.follow_file(compile_pattern(pattern), log_file, 0)
+
+        def appended(text, mode='a'):
+            with open(log_file, mode) as f:
+                f.write(text)
+            return list(the_searcher.all_matches(next(polls)))
+
+        assert appended('') == []
+        # incomplete line waits for its end
+        assert appended(TEST_TEXT[28:40]) == []
+        assert appended(TEST_TEXT[40:]) == TEST_RESULTS[' '].splitlines()
+        assert appended('') == []
+        # truncated file is read from the start
+        assert appended('Cairo\n', 'w') == ['Cairo']
+
+        # rotated file is replaced by the new one
+        os.rename(log_file, log_file + '.1')
+        assert appended('Giza\n') == ['Giza']
+        polls.close()
+
+
+def test_several_patterns():
+    other = 'of'
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pattern_file = os.path.join(tmp_dir, 'patterns.txt')
+        with open(pattern_file, 'w') as f:
+            f.write(f'{pattern}\n\n{other}\n')
+
+        for key in ('-c', '-l', '-u -c'):
+            expected = [runner.invoke(searcher, [*key.split(), p, file]).output.strip()
+                        for p in (pattern, other)]
+            for jobs in ('1', '2'):
+                result1 = runner.invoke(
+                    searcher, ['-j', jobs, *key.split(), '-e', pattern, '-e', other, file])
+                result2 = runner.invoke(searcher, ['-j', jobs, *key.split(), '-f', pattern_file, file])
+                assert [line.split('|')[1].strip() for line in result1.output.splitlines()] == expected
+                assert result1.output == result2.output
+
+        result = runner.invoke(searcher, ['-u', '-e', pattern, '-e', other, file])
+        assert output_chech(result, f'{pattern}:\n{TEST_RESULTS["-u"]}\n{other}:\nof\n')
+
+        # one pattern by option is the same as PATTERN argument
+        result = runner.invoke(searcher, ['-e', pattern, file])
+        assert output_chech(result, TEST_RESULTS[' '])
+        # list of all matches of several patterns is not supported
+        result = runner.invoke(searcher, ['-e', pattern, '-e', other, file])
+        assert result.exit_code == 2
+
+
+def test_searcher_engine():
+    engine = the_searcher.Searcher(pattern)
+    lines = TEST_TEXT.splitlines(keepends=True)
+    assert list(engine.matches([file])) == TEST_RESULTS[' '].splitlines()
+    assert list(engine.first_matches(2, lines=lines)) == TEST_RESULTS['-n 2'].splitlines()
+    assert engine.count([file]) == engine.count(lines=lines) == 5
+    assert engine.count_lines([file]) == 4
+    assert engine.count_unique([file]) == 4
+    assert list(engine.unique_matches(lines=lines)) == TEST_RESULTS['-u'].splitlines()
+    assert engine.statistic([file])['Egypt'] == 2
+
+    engine = the_searcher.Searcher(pattern, jobs=2, top=1, approx=True)
+    assert engine.count([file, file]) == 10
+    assert engine.count_unique([file]) == 4
+    assert list(engine.statistic_items(engine.statistic([file]))) == [('Egypt', 2)]
+
+    engine = the_searcher.MultiSearcher([pattern, 'of'])
+    assert engine.count([file]) == [5, 3]
+    assert engine.count_unique(lines=lines) == [4, 1]
+
+    try:
+        the_searcher.Searcher(pattern).count()
+    except ValueError:
+        pass
+    else:
+        assert False, 'input is required'
+
+
+def test_match_records():
+    result = runner.invoke(searcher, ['--records', pattern, file])
+    assert output_chech(result, 'fortest.txt:2:28:National\n'
+                                'fortest.txt:2:37:Police\n'
+                                'fortest.txt:3:44:Alexandria\n'
+                                'fortest.txt:4:74:Egypt\n'
+                                'fortest.txt:5:104:Egypt\n')
+    with open(file, 'rb') as f:
+        data = f.read()
+    for record in the_searcher.Searcher(pattern).records([file]):
+        assert data[slice(*record.span)].decode() == record.match
+        assert data.rfind(b'\n', 0, record.span[0]) + 1 == record.offset
+        assert data.count(b'\n', 0, record.offset) + 1 == record.line
+
+    # records see universal newlines like search, offsets are ones of raw bytes
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for newline in ('\r\n', '\r'):
+            path = os.path.join(tmp_dir, 'newlines.txt')
+            with open(path, 'w', newline=newline) as f:
+                f.write('abc\nxabc\néc\n')
+            data = open(path, 'rb').read()
+            assert runner.invoke(searcher, ['-c', 'c$', path]).output == '3\n'
+            records = list(the_searcher.Searcher('c$').records([path]))
+            assert [record.line for record in records] == [1, 2, 3]
+            assert [record.match for record in records] == ['c', 'c', 'c']
+            for record in records:
+                assert data[slice(*record.span)] == b'c'
+            assert [record.offset for record in records] == \
+                [0, 3 + len(newline), 7 + 2 * len(newline)]
+            records = list(the_searcher.Searcher(r'c\s').records([path]))
+            assert [record.span[1] - record.span[0] for record in records] == \
+                [1 + len(newline)] * 3
+            assert runner.invoke(searcher, ['-l', 'x', path]).output == '1\n'
+            result = runner.invoke(searcher, ['--records', 'x', path])
+            assert output_chech(result, f'{path}:2:{3 + len(newline)}:x\n')
+
+            # context lines end like lines of records
+            with open(path, 'w', newline=newline) as f:
+                f.write('a1\nERROR x\nb2\n\nc3\nERROR y\n')
+            result = runner.invoke(searcher, ['-B', '2', '-A', '1', 'ERROR', path])
+            assert result.output == f'{path}-1-a1\n{path}:2:ERROR x\n{path}-3-b2\n' \
+                                    f'{path}-4-\n{path}-5-c3\n{path}:6:ERROR y\n'
+            result = runner.invoke(searcher, ['-B', '1', '-A', '1', '-n', '1', 'ERROR', path])
+            assert result.output == f'{path}-1-a1\n{path}:2:ERROR x\n{path}-3-b2\n'
+
+    # context is read only for printed matches, contiguous lines are joined
+    result = runner.invoke(searcher, ['-n', '3', '-B', '1', '-A', '1', pattern, file])
+    assert output_chech(result, 'fortest.txt-1-acts of civil disobedience,\n'
+                                'fortest.txt:2:National Police\n'
+                                'fortest.txt:3:Alexandria\n'
+                                'fortest.txt-4-in other cities of Egypt.[12]\n')
+    result = runner.invoke(searcher, ['-A', '1', 'acts|Egypt', file])
+    assert output_chech(result, 'fortest.txt:1:acts of civil disobedience,\n'
+                                'fortest.txt-2-National Police\n'
+                                '--\n'
+                                'fortest.txt:4:in other cities of Egypt.[12]\n'
+                                'fortest.txt:5:in other cities of Egypt.[12]\n')
+
+
+def startup_imports(*args):
+    """Cumulative import times (us) of modules, imported by searcher run.
+
+    Measured by python -X importtime in a new interpreter.
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-m', 'the_searcher', *args],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True,
+    )
+    imports = {}
+    for line in process.stderr.splitlines():
+        if line.startswith('import time:') and not line.endswith('package'):
+            _, cumulative, module = line[len('import time:'):].split('|')
+            imports[module.strip()] = int(cumulative)
+    return process.stdout, imports
+
+
+def test_fast_startup():
+    assert the_searcher.fast_options(['-c', '-n', '-2', pattern, file]) == dict(
+        pattern=pattern, paths=[file], flag_u=False, flag_c=True, flag_l=False, flag_n=-2)
+    for args in (['-s', 'abc', pattern], ['-uc', pattern], [pattern, 'no such file'], []):
+        assert the_searcher.fast_options(args) is None
+
+    # simple runs don't import click and modules of other features
+    heavy = {'click', 'concurrent.futures', 'hashlib', 'bz2', 'lzma', 'threading'}
+    for key in ('-c', '-u', '-l', '-n 2', ' '):
+        output, imports = startup_imports(*key.split(), pattern, file)
+        assert output.splitlines() == TEST_RESULTS[key].splitlines()
+        assert not heavy & set(imports)
+
+    output, imports = startup_imports('--stat', 'count', pattern, file)
+    assert output.splitlines() == TEST_RESULTS['--stat count'].splitlines()
+    assert 'click' in imports
+
+
+def test_crlf_stdin():
+    # fast entry point and click command read stdin with universal newlines
+    for args in (['-l', 'c$'], ['-j', '1', '-l', 'c$'], ['-u', 'c$'], ['-j', '1', '-u', 'c$']):
+        process = subprocess.run(
+            [sys.executable, '-m', 'the_searcher', *args],
+            input=b'abc\r\nxabc\r\n', stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        assert process.stdout.splitlines() == ([b'2'] if '-l' in args else [b'c'])
+
+
+def test_profile():
+    def profile(*args):
+        process = subprocess.run(
+            [sys.executable, '-m', 'the_searcher', '--profile', *args, '-c', pattern, file],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True,
+        )
+        assert process.stdout.splitlines() == TEST_RESULTS['-c'].splitlines()
+        return json.loads(process.stderr)
+
+    result = profile()
+    assert {'read', 'match', 'output', 'other'} <= set(result['stages'])
+    assert result['total_seconds'] >= sum(result['stages'].values()) - 1e-3
+    assert result['counters']['matches'] == int(TEST_RESULTS['-c'])
+    assert result['counters']['bytes_read'] == os.path.getsize(file)
+
+    # search of workers is seen as waiting for them
+    result = profile('-j', '2')
+    assert 'workers' in result['stages']
+
+    # profile is reset after run
+    result = runner.invoke(searcher, ['--profile', '-c', pattern, file])
+    assert result.exit_code == 0
+    assert the_searcher.PROFILE is None
+
+
 if __name__ == '__main__':
     test_unique_matches()
 
     test_count_of_matches()
     test_count_of_unique_matches()
+    test_approximate_unique_count()
 
     test_lines_with_matches()
 
     test_list_of_matches()
     test_list_of_n_matches()
+    test_first_matches_stops_reading()
+    test_counting_fast_paths()
+    test_compiled_pattern_reuse()
+    test_required_literal()
+    test_mapped_file_search()
+    test_parallel_search()
+    test_compressed_files()
+    test_follow_file()
+    test_several_patterns()
+    test_searcher_engine()
+    test_match_records()
+    test_fast_startup()
+    test_crlf_stdin()
+    test_profile()
     list_of_matches_sorting()
+    test_external_sort()
 
     test_stat_no_sorting()
     test_stat_sorting()
+    test_top_matches()
+    test_space_saving_sketch()
 